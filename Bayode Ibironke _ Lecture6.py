@@ -21,6 +21,8 @@ get_ipython().run_line_magic('matplotlib', 'notebook')
 import matplotlib.pyplot as plt
 import numpy as np
 from ipywidgets import *
+from landscape import ChiSquaredGrid
+from residualplot import ResidualPlot
 
 
 #Again, don't worry too much about this code, just creating an example.  
@@ -81,13 +83,10 @@ plt.show()
 # In[3]:
 
 
-def chiSquared(x, y, dy, f, args):
-    '''Function Chi-Squared.  
-    x, y and dy are numpy arrays, referring to x, y and the uncertainty in y respectively.
-    f is the function we are fitting. 
-    args are the arguments of the function we have fit.  
-    '''
-    return 1/(len(x)-len(args))*np.sum((f(x, args)-y)**2/dy**2)
+# chiSquared(x, y, dy, f, args) returns
+# 1/(len(x)-len(args))*np.sum((f(x, args)-y)**2/dy**2); it lives in fitting.py
+# so the same code can be imported outside the notebook.
+from fitting import chiSquared
 
 
 # ### 3. Compare the equation for $\chi^2$ to the equation for $t^{\prime}$ from the last homework tutorial. In what ways are the equations similar and in what ways are they different?
@@ -120,19 +119,9 @@ def chiSquared(x, y, dy, f, args):
 # In[4]:
 
 
-def poly(x, args):
-    '''
-    returns the value of the polynomial sum (x**i*args[i])
-    '''
-    total=x**0*args[0]
-    for i in range(1,len(args)):
-        total+=x**i*args[i]
-    return total
-def linear(x, args):
-    '''
-    A special case of Poly.  
-    '''
-    return args[0]+x*args[1]
+# poly(x, args) is the polynomial sum (x**i*args[i]); linear(x, args) is the
+# special case args[0]+x*args[1].
+from fitting import linear, poly
 
 
 # Let's take a look at fitting a line to some data.  
@@ -150,32 +139,14 @@ uncertainty=np.ones(10)
 uncertainty[4]=4
 x=np.linspace(1,8,10)
 
-fig, ax=plt.subplots(1,2, figsize=(8,4))
-ax[0].set_title("force vs extension")
-line,=ax[0].plot(x,linear(x, [0,1]))
-data=ax[0].errorbar(x,y, uncertainty, fmt='.k')
-ax[1].set_title("residuals")
-residuals=linear(x,[0, 1])-y
-res=ax[1].errorbar(x,residuals, uncertainty, fmt='.k')
-ax[1].grid(True, which='both')
+sliders=dict(intercept=(-5, 20, .1), slope=(-1, 10, .1))
+grid=ChiSquaredGrid(x, y, uncertainty, **sliders)
+plot=ResidualPlot(x, y, uncertainty, grid=grid)
 plt.show()
 def update(intercept=0,slope=1):
-    fx=linear(x,[intercept, slope])
-
-    line.set_ydata(fx)
-    residuals=fx-y
-    ax[1].cla()
-    res=ax[1].errorbar(x,residuals, uncertainty, fmt='.k')
-    ax[1].grid(True, which='both')
-    ax[1].set_title("Residuals")
-    ax[1].set_xlabel("extension (cm)")
-    ax[1].set_ylabel("f(x) - y")
-    ax[0].set_xlabel("extension (cm)")
-    ax[0].set_ylabel("force (N)")
-    fig.canvas.draw_idle()
     print("chi-squared value:  ")
-    print(chiSquared(x,y, uncertainty, linear, [intercept, slope]).round(3))
-interact(update, intercept=(-5, 20, .1), slope=(-1, 10, .1));
+    print(plot.update(intercept, slope).round(3))
+interact(update, **sliders);
 
 
 # Try adjusting the slope and intercept of the line above using the sliders. Watch how the chi-squared value changes as the line becomes a better or worse fit.
@@ -225,27 +196,14 @@ interact(update, intercept=(-5, 20, .1), slope=(-1, 10, .1));
 
 largeUncertainty=uncertainty*5
 
-fig, ax=plt.subplots(1,2, figsize=(8,4))
-ax[0].set_title("force vs extension")
-line,=ax[0].plot(x,linear(x, [0,1]))
-data=ax[0].errorbar(x,y, largeUncertainty, fmt='.k')
-ax[1].set_title("residuals")
-residuals=linear(x,[0, 1])-y
-res=ax[1].errorbar(x,residuals, largeUncertainty, fmt='.k')
-ax[1].grid(True, which='both')
+sliders=dict(intercept=(-5, 12, .2), slope=(0, 5, .1))
+grid=ChiSquaredGrid(x, y, largeUncertainty, **sliders)
+plot=ResidualPlot(x, y, largeUncertainty, grid=grid)
 plt.show()
 def update(intercept=0,slope=1):
-    fx=linear(x,[intercept, slope])
-    line.set_ydata(fx)
-    residuals=fx-y
-    ax[1].cla()
-    res=ax[1].errorbar(x,residuals, largeUncertainty, fmt='.k')
-    ax[1].set_title("residuals")
-    ax[1].grid(True, which='both')
-    fig.canvas.draw_idle()
     print("chi-squared value:  ")
-    print(chiSquared(x,y, largeUncertainty, linear, [intercept, slope]).round(3))
-interact(update, intercept=(-5, 12, .2), slope=(0, 5, .1));
+    print(plot.update(intercept, slope).round(3))
+interact(update, **sliders);
 
 
 
@@ -330,29 +288,14 @@ uncertainty=np.ones(10)
 uncertainty[4]=4
 x=np.linspace(1,8,10)
 
-fig, ax=plt.subplots(1,2, figsize=(8,4))
-ax[0].set_title("force vs extension")
-line,=ax[0].plot(x,linear(x, [0,1]))
-data=ax[0].errorbar(x,y, uncertainty, fmt='.k')
-ax[1].set_title("residuals")
-residuals=linear(x,[0, 1])-y
-res=ax[1].errorbar(x,residuals, uncertainty, fmt='.k')
-ax[1].grid(True, which='both')
+sliders=dict(intercept=(-20, 20, .1), slope=(-1, 10, .1))
+grid=ChiSquaredGrid(x, y, uncertainty, **sliders)
+plot=ResidualPlot(x, y, uncertainty, grid=grid)
 plt.show()
 def update(intercept=-17,slope=5):
-    fx=linear(x,[intercept, slope])
-    line.set_ydata(fx)
-    residuals=fx-y
-    ax[1].cla()
-    res=ax[1].errorbar(x,residuals, uncertainty, fmt='.k')
-    ax[1].grid(True, which='both')
-    ax[1].set_title("Residuals")
-    ax[0].set_xlabel("extension (cm)")
-    ax[0].set_ylabel("force (N)")
-    fig.canvas.draw_idle()
     print("chi-squared value:  ")
-    print(chiSquared(x,y, uncertainty, linear, [intercept, slope]).round(3))
-interact(update, intercept=(-20, 20, .1), slope=(-1, 10, .1));
+    print(plot.update(intercept, slope).round(3))
+interact(update, **sliders);
 
 
 
@@ -375,29 +318,14 @@ uncertainty=np.ones(10)
 uncertainty[4]=4
 x=np.linspace(1,8,10)
 
-fig, ax=plt.subplots(1,2, figsize=(8,4))
-ax[0].set_title("force vs extension")
-line,=ax[0].plot(x,linear(x, [0,1]))
-data=ax[0].errorbar(x,y, uncertainty, fmt='.k')
-ax[1].set_title("residuals")
-residuals=linear(x,[0, 1])-y
-res=ax[1].errorbar(x,residuals, uncertainty, fmt='.k')
-ax[1].grid(True, which='both')
+sliders=dict(intercept=(-20, 20, .1), slope=(-1, 10, .1))
+grid=ChiSquaredGrid(x, y, uncertainty, **sliders)
+plot=ResidualPlot(x, y, uncertainty, grid=grid)
 plt.show()
 def update(intercept=-17,slope=5):
-    fx=linear(x,[intercept, slope])
-    line.set_ydata(fx)
-    residuals=fx-y
-    ax[1].cla()
-    res=ax[1].errorbar(x,residuals, uncertainty, fmt='.k')
-    ax[1].grid(True, which='both')
-    ax[1].set_title("Residuals")
-    ax[0].set_xlabel("extension (cm)")
-    ax[0].set_ylabel("force (N)")
-    fig.canvas.draw_idle()
     print("chi-squared value:  ")
-    print(chiSquared(x,y, uncertainty, linear, [intercept, slope]).round(3))
-interact(update, intercept=(-20, 20, .1), slope=(-1, 10, .1));
+    print(plot.update(intercept, slope).round(3))
+interact(update, **sliders);
 
 
 # In this case, the residuals show an upside down "v".
@@ -564,7 +492,7 @@ y=np.mean(forces, axis=1) #Take the mean of each of the sets of 5 trials in "for
 
 print("y:")
 print(y)
-dy=np.std(forces, axis=1)/np.sqrt(forces.shape[1]) #Calculate the standard uncertainty of the mean for each of the sets of 5 trials in "forces". 
+dy=np.std(forces, axis=1, ddof=1)/np.sqrt(forces.shape[1]) #Calculate the standard uncertainty of the mean for each of the sets of 5 trials in "forces". 
 #divide by square root of number of trials in each set to get the uncertainty.  
 print("dy:")
 print(dy)
@@ -583,7 +511,7 @@ print("Forces:\n", forces)
 
 # Calculate mean force measurements and their uncertainties
 y = np.mean(forces, axis=1)
-dy = np.std(forces, axis=1) / np.sqrt(forces.shape[1])
+dy = np.std(forces, axis=1, ddof=1) / np.sqrt(forces.shape[1])
 
 print("y:")
 print(y)
@@ -601,25 +529,12 @@ print(dy)
 
 
 uncertainty=dy 
-fig, ax=plt.subplots(1,2, figsize=(8,4))
-ax[0].set_title("force vs extension")
-line,=ax[0].plot(x,linear(x, [0,1]))
-data=ax[0].errorbar(x,y, uncertainty, fmt='.k')
-ax[1].set_title("residuals")
-residuals=linear(x,[0, 1])-y
-res=ax[1].errorbar(x,residuals, uncertainty, fmt='.k')
-ax[1].grid(True, which='both')
+sliders=dict(intercept=(-2, 12, .2), slope=(0, 5, .1))
+grid=ChiSquaredGrid(x, y, uncertainty, **sliders)
+plot=ResidualPlot(x, y, uncertainty, grid=grid)
 plt.show()
 def update(intercept=0,slope=1):
-    fx=linear(x,[intercept, slope])
-    line.set_ydata(fx)
-    residuals=fx-y
-    ax[1].cla()
-    res=ax[1].errorbar(x,residuals, uncertainty, fmt='.k')
-    ax[1].grid(True, which='both')
-    ax[1].set_title("Residuals")
-    fig.canvas.draw_idle()
     print("chi-squared value:  ")
-    print(chiSquared(x,y, uncertainty, linear, [intercept, slope]).round(3))
-interact(update, intercept=(-2, 12, .2), slope=(0, 5, .1));
+    print(plot.update(intercept, slope).round(3))
+interact(update, **sliders);
 
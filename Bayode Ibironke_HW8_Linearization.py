@@ -70,6 +70,9 @@
 
 #this is some imports you don't need to worry about.  
 get_ipython().run_line_magic('run', './utilities.ipynb')
+from dataset import Dataset
+from lodplot import decimatedErrorbar
+from modelselect import MODELS, evaluateModel
 
 x=[1,2,3,4,5,6,7,8,9,10]
 y=[3,9,21,33,50,77,103,130,166,205]
@@ -78,6 +81,7 @@ dy=[2,4,2,4,2,4,2,4,2,4]
 x=np.array(x)
 y=np.array(y)
 dy=np.array(dy)
+dataset=Dataset(x, y, dy)
 
 
 # Next, let's take the natural log of the x and y values and print all the values to a table (uncertainties are also propagated).
@@ -85,12 +89,11 @@ dy=np.array(dy)
 # In[3]:
 
 
-lny=np.log(y)
-dlny=dy/y
-lnx=np.log(x)
+lny=dataset.lny
+dlny=dataset.dlny
+lnx=dataset.lnx
 
-data = {'x':x,'y':y, 'dy':dy, 'ln x': lnx, 'ln y': lny, 'd ln y': dlny}
-pd.DataFrame(data=data)
+pd.DataFrame(data=dataset.table())
 
 
 # Run the code below to display three different plots: one with linear scales ($y$ vs $x$), one with semi-log scales ($\ln y$ vs $x$), and one with log-log scales ($\ln y$ vs $\ln x$).
@@ -100,19 +103,19 @@ pd.DataFrame(data=data)
 
 plt.figure()
 plt.subplot(1, 3, 1)
-plt.errorbar(x,y, dy, fmt='.')
+decimatedErrorbar(plt.gca(), x, y, dy, fmt='.')
 plt.plot()
 plt.title("Linear scale: y vs x")
 
 
 plt.subplot(1, 3, 2)
-plt.errorbar(x,lny, dlny, fmt='.')
+decimatedErrorbar(plt.gca(), x, lny, dlny, fmt='.')
 plt.plot()
 plt.title("semi-log: ln y vs x")
 
 
 plt.subplot(1, 3, 3)
-plt.errorbar(lnx,lny, dlny, fmt='.')
+decimatedErrorbar(plt.gca(), lnx, lny, dlny, fmt='.')
 plt.plot()
 plt.title("log-log: ln y vs ln x")
 plt.show()
@@ -158,9 +161,9 @@ autoFit(x=..., y=..., dy=..., title="log-log fit",xaxis="lnx", yaxis="lny" )"
 """
 
 
-lny = np.log(y)
-dlny = dy / y
-lnx = np.log(x)
+lny = dataset.lny
+dlny = dataset.dlny
+lnx = dataset.lnx
 
 autoFit(x=x, y=y, dy=dy, title="Linear fit", xaxis="x", yaxis="y")
 
@@ -168,6 +171,10 @@ autoFit(x=x, y=lny, dy=dlny, title="Semi-log fit", xaxis="x", yaxis="lny")
 
 autoFit(x=lnx, y=lny, dy=dlny, title="log-log fit", xaxis="lnx", yaxis="lny")
 
+models=dataset.selectModel()
+pd.DataFrame({'model': MODELS, 'A': models['A'], 'B': models['B'],
+              'reduced chi-squared': models['chi2'], 'AIC': models['aic'], 'BIC': models['bic']})
+
 
 # ### 5. Examine the three fits produced quantitatively. Do you think $x$ and $y$ are related linearly, exponentially, or according to a power law? Please explain your reasoning.
 # 
@@ -239,14 +246,14 @@ plt.show()
 
 
 plt.figure()
-A=2.337475
-B=1.463986
+best=models['best']
+A=models['A'][best]
+B=models['B'][best]
 
 x_best_fit=np.linspace(0,10)
 
-# choose one of these... comment out the other using a #
-f=A*x_best_fit**B  # power law
-# f=A*np.e**(B*x_best_fit) # exponential
+# the model with the lowest reduced chi-squared (the power law for this data)
+f=evaluateModel(MODELS[best], x_best_fit, A, B)
 
 plt.title("Linear fit")
 plt.errorbar(x,y, dy, fmt='.', label="data")
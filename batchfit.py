@@ -0,0 +1,127 @@
+'''
+Headless version of the three autoFit calls in the Linearization notebook
+(linear, semi-log and log-log), run over many datasets in a process pool.
+
+    table=fitMany(datasets)
+    pd.DataFrame(table)
+
+gives one row per dataset and transform with the fit parameters, their
+uncertainties and the reduced chi-squared. Nothing is plotted.
+'''
+from concurrent.futures import ProcessPoolExecutor
+import os
+
+import numpy as np
+
+from fitting import effectiveVarianceFit, weightedLinearFit
+from profiling import profiled, stage
+
+
+@profiled("transform")
+def linearScale(x, y, dy):
+    '''y vs x.'''
+    return x, y, dy
+
+
+@profiled("transform")
+def semiLog(x, y, dy):
+    '''ln y vs x.'''
+    return x, np.log(y), dy/y
+
+
+@profiled("transform")
+def logLog(x, y, dy):
+    '''ln y vs ln x.'''
+    return np.log(x), np.log(y), dy/y
+
+
+TRANSFORMS={"linear": linearScale, "semi-log": semiLog, "log-log": logLog}
+# the uncertainty in the transformed x, from x and dx: d ln x = dx/x
+XERRORS={"linear": lambda x, dx: dx, "semi-log": lambda x, dx: dx,
+         "log-log": lambda x, dx: dx/x}
+
+
+def fitTransforms(x, y, dy, transforms=TRANSFORMS, dx=None):
+    '''Fits y vs x under each transform.
+    x, y and dy are (N,) arrays, or (B, N) stacks of B datasets of N points.
+    With dx, the x uncertainties, each fit is an effectiveVarianceFit with
+    dx carried through the transform by XERRORS.
+    Returns a dict of transform name -> weightedLinearFit result.
+    '''
+    x=np.asarray(x, dtype=float)
+    y=np.asarray(y, dtype=float)
+    dy=np.asarray(dy, dtype=float)
+    if dx is None:
+        return {name: weightedLinearFit(*transform(x, y, dy))
+                for name, transform in transforms.items()}
+    dx=np.asarray(dx, dtype=float)
+    return {name: effectiveVarianceFit(*transform(x, y, dy), XERRORS[name](x, dx))
+            for name, transform in transforms.items()}
+
+
+COLUMNS=("intercept", "slope", "dintercept", "dslope", "chi2")
+
+
+def _columns(fits):
+    '''(B, transforms, 5) array of COLUMNS from a stacked fitTransforms result.'''
+    return np.stack([np.stack([args[..., 0], args[..., 1], np.sqrt(cov[..., 0, 0]),
+                               np.sqrt(cov[..., 1, 1]), chi2], axis=-1)
+                     for args, cov, chi2 in fits.values()], axis=-2)
+
+
+def _fitChunk(chunk):
+    '''Worker: fits a list of (name, x, y, dy) or (name, x, y, dy, dx),
+    stacking datasets of equal length (and with or without dx).
+    Returns the names and their (len(chunk), transforms, 5) results, in order.
+    '''
+    groups={}
+    for i, item in enumerate(chunk):
+        groups.setdefault((len(item[1]), len(item)), []).append(i)
+    results=np.empty((len(chunk), len(TRANSFORMS), len(COLUMNS)))
+    for (_, width), indices in groups.items():
+        x, y, dy, *dx=(np.array([chunk[i][j] for i in indices], dtype=float)
+                       for j in range(1, width))
+        results[indices]=_columns(fitTransforms(x, y, dy, dx=dx[0] if dx else None))
+    return [item[0] for item in chunk], results
+
+
+def _chunks(datasets, chunksize):
+    chunk=[]
+    for item in datasets:
+        chunk.append(item)
+        if len(chunk)==chunksize:
+            yield chunk
+            chunk=[]
+    if chunk:
+        yield chunk
+
+
+def fitMany(datasets, workers=None, chunksize=256):
+    '''Fits every dataset under the linear, semi-log and log-log transforms.
+    datasets is an iterable of (name, x, y, dy) tuples, or a dict of
+    name -> (x, y, dy); a dataset with a fifth column dx (the x
+    uncertainties) is fit by effectiveVarianceFit instead. They are sent
+    to the workers chunksize at a time so each worker fits whole stacks
+    of datasets per task.
+    workers defaults to the number of CPUs; workers=1 runs in this process.
+    Returns a dict of columns, one row per dataset and transform in the
+    order of datasets, ready for pd.DataFrame.
+    '''
+    if isinstance(datasets, dict):
+        datasets=((name,)+tuple(data) for name, data in datasets.items())
+    chunks=_chunks(datasets, chunksize)
+    workers=workers or os.cpu_count()
+    if workers==1:
+        done=[_fitChunk(chunk) for chunk in chunks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            done=list(pool.map(_fitChunk, chunks))
+    with stage("table"):
+        names=[name for chunkNames, _ in done for name in chunkNames]
+        results=np.concatenate([chunkResults for _, chunkResults in done]) if done else \
+            np.empty((0, len(TRANSFORMS), len(COLUMNS)))
+        table={"dataset": [name for name in names for _ in TRANSFORMS],
+               "transform": list(TRANSFORMS)*len(names)}
+        for i, column in enumerate(COLUMNS):
+            table[column]=results[:, :, i].ravel()
+    return table
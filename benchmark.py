@@ -0,0 +1,183 @@
+'''
+Timing and peak memory of the fitting hot paths on synthetic data.
+
+    python benchmark.py --out results.json
+    python benchmark.py --quick --compare results.json
+
+Each case runs for every dataset length N and batch size B (number of
+series) in the grid, skipping combinations larger than --max-elements.
+The JSON output records the machine, library versions and git commit
+along with the best time over --repeat runs and the tracemalloc peak of
+one run, so results from two versions can be compared with --compare.
+'''
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from batchfit import fitTransforms
+from fitting import chiSquared, chiSquaredBatch, linear, poly, weightedLinearFit
+from modelselect import selectModel
+from replicates import ReplicateStats
+
+SIZES=(10, 100, 1000, 10**4, 10**5, 10**6, 10**7)
+BATCHES=(1, 10, 100, 1000, 10**4, 10**5)
+TRIALS=5
+
+
+def makeData(n, batch, seed=0):
+    '''Power-law series y = 2 x^1.5 with 5% noise, shape (batch, n).'''
+    rng=np.random.default_rng(seed)
+    x=np.linspace(1, 10, n)
+    truth=2*x**1.5
+    dy=0.05*truth
+    y=truth+dy*rng.standard_normal((batch, n))
+    return x, y, np.broadcast_to(dy, y.shape)
+
+
+def _forces(n, batch, seed=0):
+    rng=np.random.default_rng(seed)
+    x=np.linspace(1, 10, n)
+    return x[:, None]+rng.standard_normal((batch, n, TRIALS))
+
+
+def _setups():
+    '''Case name -> (setup(n, batch) -> state, run(state)).'''
+    def loop(name):
+        # the scalar path, one parameter set per call, over the batch
+        def setup(n, batch):
+            x, y, dy=makeData(n, 1)
+            params=np.random.default_rng(1).normal(size=(batch, 2))+[0, 1]
+            return x, y[0], dy[0], params
+        if name=="chiSquared":
+            return setup, lambda s: [chiSquared(s[0], s[1], s[2], linear, p) for p in s[3]]
+        return setup, lambda s: chiSquaredBatch(s[0], s[1], s[2], linear, s[3])
+
+    def polySetup(n, batch):
+        x=np.linspace(-1, 1, n)
+        return x, np.random.default_rng(1).normal(size=(batch, 4))
+
+    def fitSetup(n, batch):
+        return makeData(n, batch)
+
+    def replicateReduction(forces):
+        y=np.mean(forces, axis=-1)
+        return y, np.std(forces, axis=-1, ddof=1)/np.sqrt(forces.shape[-1])
+
+    def streamingReduction(forces):
+        stats=ReplicateStats()
+        for trial in np.moveaxis(forces, -1, 0):
+            stats.add(trial.reshape(-1))
+        return stats.y, stats.dy
+
+    return {
+        "chiSquared": loop("chiSquared"),
+        "chiSquaredBatch": loop("chiSquaredBatch"),
+        "poly": (polySetup, lambda s: poly(s[0], s[1])),
+        "linear": (polySetup, lambda s: linear(s[0], s[1].T[:, :, None])),
+        "weightedLinearFit": (fitSetup, lambda s: weightedLinearFit(*s)),
+        "replicateMeanStd": (_forces, replicateReduction),
+        "replicateStreaming": (_forces, streamingReduction),
+        "threeWayFit": (fitSetup, lambda s: fitTransforms(*s)),
+        "threeWayFitXErrors": (lambda n, batch: makeData(n, batch)+(0.01*np.linspace(1, 10, n),),
+                               lambda s: fitTransforms(*s[:3], dx=s[3])),
+        "selectModel": (fitSetup, lambda s: selectModel(*s)),
+    }
+
+
+CASES=tuple(_setups())
+
+
+def measure(run, state, repeat):
+    '''(best seconds over repeat runs, tracemalloc peak bytes of one run).'''
+    best=np.inf
+    for _ in range(repeat):
+        start=time.perf_counter()
+        run(state)
+        best=min(best, time.perf_counter()-start)
+    tracemalloc.start()
+    run(state)
+    peak=tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best, peak
+
+
+def _commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def runBenchmarks(cases=CASES, sizes=SIZES, batches=BATCHES, maxElements=10**7, repeat=3,
+                  log=None):
+    '''Runs every case over the size grid and returns the JSON-ready report.'''
+    setups=_setups()
+    results=[]
+    for case in cases:
+        setup, run=setups[case]
+        for n in sizes:
+            for batch in batches:
+                if n*batch>maxElements:
+                    continue
+                seconds, peak=measure(run, setup(n, batch), repeat)
+                results.append({"case": case, "n": n, "batch": batch,
+                                "seconds": seconds, "peakBytes": peak})
+                if log:
+                    log("%-20s N=%-9d B=%-7d %12.6f s %12d bytes"%(case, n, batch, seconds, peak))
+    return {"python": sys.version.split()[0], "numpy": np.__version__,
+            "platform": platform.platform(), "machine": platform.machine(),
+            "commit": _commit(), "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "results": results}
+
+
+def compare(old, new, threshold=1.2):
+    '''Lines for every case/N/B that got slower by more than threshold times.'''
+    before={(r["case"], r["n"], r["batch"]): r for r in old["results"]}
+    lines=[]
+    for r in new["results"]:
+        key=(r["case"], r["n"], r["batch"])
+        if key in before and r["seconds"]>threshold*before[key]["seconds"]:
+            lines.append("%-20s N=%-9d B=%-7d %.2fx slower"
+                         %(key+(r["seconds"]/before[key]["seconds"],)))
+    return lines
+
+
+def main(argv=None):
+    parser=argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--out", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="JSON results of an earlier run to compare with")
+    parser.add_argument("--cases", nargs="+", choices=CASES, default=CASES)
+    parser.add_argument("--sizes", nargs="+", type=int, default=SIZES)
+    parser.add_argument("--batches", nargs="+", type=int, default=BATCHES)
+    parser.add_argument("--max-elements", type=int, default=10**7)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--quick", action="store_true",
+                        help="only N in 10, 1000, 1e5 and B in 1, 10, 1000, up to 1e6 elements")
+    args=parser.parse_args(argv)
+    if args.quick:
+        args.sizes=[n for n in args.sizes if n in (10, 1000, 10**5)]
+        args.batches=[b for b in args.batches if b in (1, 10, 1000)]
+        args.max_elements=min(args.max_elements, 10**6)
+
+    report=runBenchmarks(args.cases, args.sizes, args.batches, args.max_elements, args.repeat,
+                         log=print)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=1)
+    if args.compare:
+        with open(args.compare) as f:
+            slower=compare(json.load(f), report)
+        print("\n".join(slower) if slower else "no regressions")
+        return 1 if slower else 0
+    return 0
+
+
+if __name__=="__main__":
+    sys.exit(main())
@@ -0,0 +1,137 @@
+'''
+A measured dataset (x, y, dy) that keeps the columns derived from it.
+'''
+import numpy as np
+
+from batchfit import TRANSFORMS
+from fitting import lineFromSums
+from modelselect import selectModel
+from profiling import profiled
+
+_log=profiled("transform")(np.log)
+
+
+class Dataset:
+    '''x, y and dy with ln x, ln y, d ln y, weights and fits computed on
+    first use and then reused.
+    The raw arrays are stored read-only; assigning a new x, y or dy (or
+    calling update) clears everything derived from them.
+    '''
+
+    def __init__(self, x, y, dy):
+        self._cache={}
+        self.update(x=x, y=y, dy=dy)
+
+    def update(self, x=None, y=None, dy=None):
+        '''Replaces any of the raw arrays and forgets the derived columns.'''
+        for name, value in (("x", x), ("y", y), ("dy", dy)):
+            if value is not None:
+                value=np.array(value, dtype=float)
+                value.setflags(write=False)
+                setattr(self, "_"+name, value)
+        self._cache.clear()
+
+    @property
+    def x(self):
+        return self._x
+
+    @x.setter
+    def x(self, value):
+        self.update(x=value)
+
+    @property
+    def y(self):
+        return self._y
+
+    @y.setter
+    def y(self, value):
+        self.update(y=value)
+
+    @property
+    def dy(self):
+        return self._dy
+
+    @dy.setter
+    def dy(self, value):
+        self.update(dy=value)
+
+    def _cached(self, key, compute):
+        if key not in self._cache:
+            self._cache[key]=compute()
+        return self._cache[key]
+
+    @property
+    def lnx(self):
+        return self._cached("lnx", lambda: _log(self.x))
+
+    @property
+    def lny(self):
+        return self._cached("lny", lambda: _log(self.y))
+
+    @property
+    def dlny(self):
+        '''Uncertainty in ln y, propagated as dy/y.'''
+        return self._cached("dlny", lambda: self.dy/self.y)
+
+    @property
+    def weights(self):
+        '''1/dy**2.'''
+        return self._cached("weights", lambda: 1/self.dy**2)
+
+    @property
+    def lnWeights(self):
+        '''1/(d ln y)**2.'''
+        return self._cached("lnWeights", lambda: 1/self.dlny**2)
+
+    def columns(self, transform):
+        '''(x, y, dy) plotted and fit under one of the batchfit TRANSFORMS.'''
+        if transform=="linear":
+            return self.x, self.y, self.dy
+        if transform=="semi-log":
+            return self.x, self.lny, self.dlny
+        if transform=="log-log":
+            return self.lnx, self.lny, self.dlny
+        raise ValueError("unknown transform %r, expected one of %s"
+                         %(transform, ", ".join(TRANSFORMS)))
+
+    def sums(self, transform):
+        '''Weighted sums of the transformed columns X, Y from the cached
+        weights: S, the weighted means xbar and ybar, and Stt, Sty and Syy
+        of t=X-xbar and Y-ybar.
+        '''
+        def compute():
+            X, Y, _=self.columns(transform)
+            w=self.weights if transform=="linear" else self.lnWeights
+            S=np.sum(w, axis=-1)
+            xbar=np.sum(w*X, axis=-1)/S
+            ybar=np.sum(w*Y, axis=-1)/S
+            t=X-xbar[..., None]
+            u=Y-ybar[..., None]
+            wt=w*t
+            return {"S": S, "xbar": xbar, "ybar": ybar, "Stt": np.sum(wt*t, axis=-1),
+                    "Sty": np.sum(wt*u, axis=-1), "Syy": np.sum(w*u*u, axis=-1)}
+        return self._cached(("sums", transform), compute)
+
+    def fit(self, transform="linear"):
+        '''(args, cov, chi2) of the transformed columns, as weightedLinearFit
+        returns them, solved from sums.
+        '''
+        def compute():
+            s=self.sums(transform)
+            args, cov=lineFromSums(s["S"], s["xbar"], s["ybar"], s["Stt"], s["Sty"])
+            chi2=np.maximum(s["Syy"]-args[..., 1]*s["Sty"], 0)/(self.x.shape[-1]-2)
+            return args, cov, chi2
+        return self._cached(("fit", transform), compute)
+
+    def selectModel(self):
+        '''modelselect.selectModel of this dataset, with its cached columns
+        and weights.
+        '''
+        return self._cached("selectModel",
+                            lambda: selectModel(self.x, self.y, self.dy, self.lnx, self.lny,
+                                                self.weights, self.lnWeights))
+
+    def table(self):
+        '''Columns for the x, y, dy, ln x, ln y, d ln y table.'''
+        return {'x': self.x, 'y': self.y, 'dy': self.dy,
+                'ln x': self.lnx, 'ln y': self.lny, 'd ln y': self.dlny}
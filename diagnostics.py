@@ -0,0 +1,75 @@
+'''
+Checks on the residuals of a fit, beyond the chi-squared value.
+
+A straight line through curved data (like the y=.5*(y-2)**2 example in
+the curve fitting tutorial) can still have a passable chi-squared when
+the uncertainties are large, but its residuals come in long runs of the
+same sign. These statistics look for that, and for residuals that are
+not normally distributed, over a whole (B, N) stack of fits at once.
+'''
+import math
+from statistics import NormalDist
+
+import numpy as np
+
+from profiling import profiled
+
+
+@profiled("diagnostics")
+def residualDiagnostics(x, y, dy, fx, alpha=0.05):
+    '''Diagnostics of the normalized residuals (f(x)-y)/dy of each fit.
+    x, y, dy and fx (the fit evaluated at x) are (N,) or (B, N); the
+    points are taken in increasing x. alpha is the false alarm rate of
+    the systematic flag: the chance that it is set for a good fit.
+    Returns a dict with
+    residuals: the normalized residuals, in the input order;
+    runs, runsZ: the number of runs of equal sign and its z score against
+        the Wald-Wolfowitz expectation (strongly negative: too few runs);
+    durbinWatson: sum of squared successive differences over the sum of
+        squares, about 2 for independent residuals and near 0 for
+        smoothly varying ones;
+    skew, kurtosis, normality: sample skewness, excess kurtosis, and the
+        Jarque-Bera statistic built from them (chi-squared with 2
+        degrees of freedom when the residuals are normal);
+    systematic: True where there are too few runs, Durbin-Watson is too
+        low (both one-sided), or normality exceeds the chi-squared (2
+        degrees of freedom) level, each test at alpha/3 so that together
+        they flag about alpha of good fits (with alpha=0.05, 5.6% of pure
+        noise at N=50 and 5.1% at N=1000, the Jarque-Bera level being
+        approximate for small N).
+    '''
+    x, y, dy, fx=np.broadcast_arrays(*(np.asarray(a, dtype=float) for a in (x, y, dy, fx)))
+    r=(fx-y)/dy
+    order=np.argsort(x, axis=-1, kind='stable')
+    u=np.take_along_axis(r, order, axis=-1)
+    n=u.shape[-1]
+
+    positive=u>0
+    plus=np.sum(positive, axis=-1).astype(float)
+    minus=n-plus
+    runs=1+np.sum(positive[..., 1:]!=positive[..., :-1], axis=-1)
+    expected=1+2*plus*minus/n
+    variance=2*plus*minus*(2*plus*minus-n)/(n*n*(n-1))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        runsZ=np.where(variance>0, (runs-expected)/np.sqrt(variance), 0.0)
+
+    squares=np.sum(u*u, axis=-1)
+    durbinWatson=np.sum(np.diff(u, axis=-1)**2, axis=-1)/squares
+    # under independence DW is about normal with mean 2 and variance 4/n
+    dwZ=(durbinWatson-2)/np.sqrt(4/n)
+
+    centred=u-np.mean(u, axis=-1, keepdims=True)
+    m2=np.mean(centred**2, axis=-1)
+    skew=np.mean(centred**3, axis=-1)/m2**1.5
+    kurtosis=np.mean(centred**4, axis=-1)/m2**2-3
+    normality=n/6*(skew**2+kurtosis**2/4)
+
+    # a misfit shows up as too few runs and too small a Durbin-Watson value, so
+    # both are one-sided; chi-squared with 2 degrees of freedom has tail exp(-q/2).
+    # Each test gets a third of alpha, so the three together stay within it
+    each=alpha/3
+    critical=NormalDist().inv_cdf(each)
+    systematic=(runsZ<critical)|(dwZ<critical)|(normality>-2*math.log(each))
+    return {"residuals": r, "runs": runs, "runsZ": runsZ, "durbinWatson": durbinWatson,
+            "skew": skew, "kurtosis": kurtosis, "normality": normality,
+            "systematic": systematic}
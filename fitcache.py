@@ -0,0 +1,184 @@
+'''
+Fit results kept on disk, so that unchanged datasets are not refit.
+
+Entries are keyed by a hash of the contents of x, y and dy together with
+the model name and its options, and stored one .npz file per entry in a
+cache directory. Several processes can share a directory: entries are
+written to a temporary file and renamed into place, and an entry that
+disappears (evicted by another process) is just a miss. The most
+recently used entries are also kept in memory, so a repeated lookup in
+the same process costs a hash and a dict access.
+'''
+from collections import OrderedDict
+import hashlib
+import os
+import uuid
+
+import numpy as np
+
+from fitting import weightedLinearFit, weightedPolyFit
+from modelselect import selectModel
+from nonlinear import fitExponential, fitPowerLaw
+from profiling import profiled
+
+# eviction goes down to this fraction of the limits, so it runs once per
+# many writes rather than on every one
+LOW_WATER=0.9
+
+
+def _asDict(fit):
+    args, cov, chi2=fit
+    return {"args": args, "cov": cov, "chi2": chi2}
+
+
+MODELS={
+    "linear": lambda x, y, dy: _asDict(weightedLinearFit(x, y, dy)),
+    "poly": lambda x, y, dy, degree: _asDict(weightedPolyFit(x, y, dy, degree)),
+    "power law": fitPowerLaw,
+    "exponential": fitExponential,
+    "select": selectModel,
+}
+
+
+def contentKey(x, y, dy, model, **options):
+    '''Hex digest of the float64 values and shapes of x, y and dy, the
+    model name and the options (compared by repr).
+    '''
+    h=hashlib.blake2b(digest_size=20)
+    for a in (x, y, dy):
+        a=np.ascontiguousarray(a, dtype=float)
+        h.update(repr(a.shape).encode())
+        h.update(a.data)
+    h.update(repr((model, sorted(options.items()))).encode())
+    return h.hexdigest()
+
+
+class FitCache:
+    '''A directory of fit results, evicting the least recently used
+    entries once they take more than maxBytes (or number more than
+    maxEntries). memoryEntries results are also held in this process.
+    The size of the directory is read when the cache is opened and after
+    each eviction, and between those only this process's writes are
+    added to it, so entries written by other processes are noticed at
+    the next eviction.
+    '''
+
+    def __init__(self, path, maxBytes=2**28, maxEntries=None, memoryEntries=1024):
+        self.path=path
+        self.maxBytes=maxBytes
+        self.maxEntries=maxEntries
+        self.memoryEntries=memoryEntries
+        self.hits=0
+        self.misses=0
+        self._memory=OrderedDict()
+        os.makedirs(path, exist_ok=True)
+        self._scan()
+
+    def _file(self, key):
+        return os.path.join(self.path, key+".npz")
+
+    def _remember(self, key, result):
+        self._memory[key]=result
+        self._memory.move_to_end(key)
+        if len(self._memory)>self.memoryEntries:
+            self._memory.popitem(last=False)
+
+    def get(self, key):
+        '''The stored result dict for key, or None.'''
+        result=self._memory.get(key)
+        if result is not None:
+            self._memory.move_to_end(key)
+            return result
+        try:
+            with np.load(self._file(key), allow_pickle=False) as stored:
+                result={name: stored[name] for name in stored.files}
+            # the modification time orders entries for eviction
+            os.utime(self._file(key))
+        except (FileNotFoundError, ValueError, OSError):
+            return None
+        for values in result.values():
+            values.setflags(write=False)
+        self._remember(key, result)
+        return result
+
+    @profiled("write")
+    def put(self, key, result):
+        '''Stores a dict of arrays under key, evicting old entries if the
+        limits are passed. Returns the stored, read-only, arrays.
+        '''
+        result={name: np.array(values) for name, values in result.items()}
+        temporary=os.path.join(self.path, "%s.%s.tmp"%(key, uuid.uuid4().hex))
+        with open(temporary, "wb") as f:
+            np.savez(f, **result)
+            size=f.tell()
+        os.replace(temporary, self._file(key))
+        for values in result.values():
+            values.setflags(write=False)
+        self._remember(key, result)
+        self._bytes+=size
+        self._entries+=1
+        if self._bytes>self.maxBytes or (self.maxEntries is not None
+                                         and self._entries>self.maxEntries):
+            self.evict()
+        return result
+
+    def _scan(self):
+        '''(modification time, size, path) of every entry, newest first.'''
+        entries=[]
+        for entry in os.scandir(self.path):
+            if not entry.name.endswith(".npz"):
+                continue
+            try:
+                stat=entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+        entries.sort(reverse=True)
+        self._bytes=sum(size for _, size, _ in entries)
+        self._entries=len(entries)
+        return entries
+
+    def evict(self):
+        '''Removes the least recently used entries until they are within
+        LOW_WATER of the limits.
+        '''
+        maxBytes=LOW_WATER*self.maxBytes
+        maxEntries=None if self.maxEntries is None else int(LOW_WATER*self.maxEntries)
+        total=count=0
+        for _, size, path in self._scan():
+            if total+size>maxBytes or (maxEntries is not None and count>=maxEntries):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                self._memory.pop(os.path.basename(path)[:-4], None)
+            else:
+                total+=size
+                count+=1
+        self._bytes=total
+        self._entries=count
+
+    def clear(self):
+        '''Removes every entry.'''
+        self._memory.clear()
+        self._bytes=self._entries=0
+        for entry in os.scandir(self.path):
+            if entry.name.endswith(".npz"):
+                try:
+                    os.remove(entry.path)
+                except FileNotFoundError:
+                    pass
+
+    def fit(self, x, y, dy, model="linear", **options):
+        '''The result of MODELS[model](x, y, dy, **options), from the cache
+        when the same data, model and options were fit before. The arrays
+        returned are read-only, since they may be shared with later calls.
+        '''
+        fitter=MODELS[model]
+        key=contentKey(x, y, dy, model, **options)
+        result=self.get(key)
+        if result is not None:
+            self.hits+=1
+            return result
+        self.misses+=1
+        return self.put(key, fitter(x, y, dy, **options))
@@ -0,0 +1,223 @@
+'''
+Fitting functions used by the curve fitting and linearization tutorials.
+'''
+import math
+
+import numpy as np
+
+from profiling import profiled
+
+
+@profiled("chiSquared")
+def chiSquared(x, y, dy, f, args):
+    '''Function Chi-Squared.
+    x, y and dy are numpy arrays, referring to x, y and the uncertainty in y respectively.
+    f is the function we are fitting.
+    args are the arguments of the function we have fit.
+    '''
+    return 1/(len(x)-len(args))*np.sum((f(x, args)-y)**2/dy**2)
+
+
+@profiled("chiSquared")
+def chiSquaredBatch(x, y, dy, f, params):
+    '''Chi-Squared for many parameter sets at once.
+    params is an (M, k) array, one row of k arguments per candidate fit.
+    f is called once with args[i] of shape (M, 1), so it must broadcast the
+    way linear and poly do.
+    Returns an array of M values, equal to chiSquared for each row.
+    '''
+    x=np.asarray(x)
+    params=np.atleast_2d(params)
+    fx=f(x, params.T[:, :, None])
+    return 1/(len(x)-params.shape[1])*np.sum((fx-y)**2/dy**2, axis=-1)
+
+
+@profiled("chiSquared")
+def chiSquaredChunked(x, y, dy, f, args, dtype=np.float32, chunk=2**16):
+    '''chiSquared for very long arrays, a chunk of points at a time.
+    x, y and dy are read chunk points at a time (they can be memory-mapped)
+    and converted to dtype, float32 by default. Only when they are already
+    stored as float32 (storage.writeColumns(..., dtype=np.float32)) does a
+    chunk move half the bytes of the float64 path; float64 inputs are read
+    in full and then cast. The residual is formed, divided by dy and
+    squared in place in one chunk-sized buffer, so no full-length
+    temporaries are made. Each chunk is summed with a float64 accumulator
+    (numpy's pairwise summation) and the chunk totals are added exactly
+    with math.fsum.
+
+    Compared with chiSquared in float64, the float32 path rounds x, y and
+    dy to about 6e-8 relative, and then the residual f(x)-y loses digits
+    in proportion to |y|/|f(x)-y|. Each term of the sum is therefore good
+    to roughly 6e-8*|y|/dy, and the reduced chi-squared to about the same
+    relative amount, e.g. 1e-5 when y is about 100 times its uncertainty.
+    The summation itself adds no visible error. Pass dtype=np.float64 to
+    get the float64 values with the same bounded memory.
+    '''
+    n=len(x)
+    partial=[]
+    buffer=np.empty(min(chunk, n), dtype=dtype)
+    for start in range(0, n, chunk):
+        stop=min(start+chunk, n)
+        r=buffer[:stop-start]
+        xc=np.asarray(x[start:stop], dtype=dtype)
+        np.subtract(f(xc, args), np.asarray(y[start:stop], dtype=dtype), out=r)
+        np.divide(r, np.asarray(dy[start:stop], dtype=dtype), out=r)
+        np.multiply(r, r, out=r)
+        partial.append(float(np.sum(r, dtype=np.float64)))
+    return math.fsum(partial)/(n-len(args))
+
+
+def poly(x, args, out=None):
+    '''
+    returns the value of the polynomial sum (x**i*args[i])
+    evaluated with Horner's scheme, in place in a single output buffer.
+    args may also be an (M, k) array of M coefficient rows, in which case
+    the result has shape (M,) + x.shape.
+    out is an optional preallocated array to write the result into.
+    '''
+    x=np.asarray(x)
+    coefs=np.asarray(args)
+    if coefs.ndim==2:
+        coefs=coefs.T.reshape(coefs.shape[::-1]+(1,)*x.ndim)
+    shape=np.broadcast_shapes(x.shape, coefs.shape[1:])
+    if out is None:
+        out=np.empty(shape, dtype=np.result_type(x, coefs, 1.0))
+    out[...]=coefs[-1]
+    for i in range(len(coefs)-2, -1, -1):
+        out*=x
+        out+=coefs[i]
+    return out if out.ndim else out[()]
+
+
+def powerMatrix(mid, half, size):
+    '''M with poly args in x = M @ poly args in t, for t = (x-mid)/half,
+    converting a fit made on a rescaled x back to x itself.
+    '''
+    M=np.zeros((size, size))
+    for j in range(size):
+        for i in range(j+1):
+            M[i, j]=math.comb(j, i)*(-mid)**(j-i)/half**j
+    return M
+
+
+def linear(x, args):
+    '''
+    A special case of Poly.
+    '''
+    return args[0]+x*args[1]
+
+
+def powerLaw(x, args):
+    '''
+    args[0]*x**args[1], the power law A x^B.
+    '''
+    return args[0]*x**args[1]
+
+
+def exponential(x, args):
+    '''
+    args[0]*e**(args[1]*x), the exponential A e^(Bx).
+    '''
+    return args[0]*np.exp(args[1]*x)
+
+
+def lineFromSums(S, xbar, ybar, Stt, Sty):
+    '''Weighted line from the sums of its points: S the sum of weights,
+    xbar and ybar the weighted means, Stt and Sty the weighted sums of
+    t*t and t*(y-ybar) for t=x-xbar.
+    Returns (args, cov), with args [intercept, slope] of shape (..., 2)
+    and the (..., 2, 2) covariance, as in weightedLinearFit.
+    '''
+    slope=Sty/Stt
+    args=np.stack([ybar-slope*xbar, slope], axis=-1)
+    cov=np.stack([np.stack([1/S+xbar**2/Stt, -xbar/Stt], axis=-1),
+                  np.stack([-xbar/Stt, 1/Stt], axis=-1)], axis=-2)
+    return args, cov
+
+
+@profiled("solve")
+def weightedLinearFit(x, y, dy):
+    '''Best-fit line by weighted least squares, with weights 1/dy**2.
+    Solves the normal equations directly, so there is no search over
+    intercept and slope.
+    x, y and dy can be 1D arrays of N points, or stacks of shape (B, N)
+    (x and dy broadcast against y) to fit B datasets in one call.
+    Returns (args, cov, chi2): args is [intercept, slope] with shape (..., 2),
+    cov is the (..., 2, 2) parameter covariance and chi2 is the reduced
+    chiSquared of the fit.
+    '''
+    x, y, dy=np.broadcast_arrays(np.asarray(x, dtype=float), np.asarray(y, dtype=float),
+                                 np.asarray(dy, dtype=float))
+    w=1/dy**2
+    S=np.sum(w, axis=-1)
+    xbar=np.sum(w*x, axis=-1)/S
+    ybar=np.sum(w*y, axis=-1)/S
+    # centring on the weighted means keeps the normal equations well conditioned
+    t=x-xbar[..., None]
+    Stt=np.sum(w*t*t, axis=-1)
+    Sty=np.sum(w*t*(y-ybar[..., None]), axis=-1)
+    args, cov=lineFromSums(S, xbar, ybar, Stt, Sty)
+    residuals=args[..., 0, None]+args[..., 1, None]*x-y
+    chi2=np.sum(w*residuals**2, axis=-1)/(x.shape[-1]-2)
+    return args, cov, chi2
+
+
+def _effectiveSlope(x, y, dy2, dx2, slope):
+    '''Slope of the weighted line fit with weights 1/(dy2+slope**2*dx2).'''
+    w=1/(dy2+slope[..., None]**2*dx2)
+    S=np.sum(w, axis=-1)
+    t=x-(np.sum(w*x, axis=-1)/S)[..., None]
+    return np.sum(w*t*y, axis=-1)/np.sum(w*t*t, axis=-1)
+
+
+def effectiveVarianceFit(x, y, dy, dx, maxIterations=20, tol=1e-10):
+    '''Best-fit line when x is uncertain too.
+    An error dx in x moves the line's value by slope*dx, so each point
+    is weighted by its effective variance dy**2+(slope*dx)**2, and the
+    slope is the one that reproduces itself when fit with those weights.
+    It is found by secant steps from the dx=0 fit, for all datasets of a
+    stack together; a few steps usually reach tol. Shapes are as in
+    weightedLinearFit.
+    Returns (args, cov, chi2) like weightedLinearFit, with cov and chi2
+    computed from the effective variances.
+    '''
+    x, y, dy, dx=np.broadcast_arrays(*(np.asarray(a, dtype=float) for a in (x, y, dy, dx)))
+    dy2=dy**2
+    dx2=dx**2
+    previous=weightedLinearFit(x, y, dy)[0][..., 1]
+    step=_effectiveSlope(x, y, dy2, dx2, previous)-previous
+    slope=previous+step
+    for _ in range(maxIterations):
+        newStep=_effectiveSlope(x, y, dy2, dx2, slope)-slope
+        if np.all(np.abs(newStep)<=tol*(1+np.abs(slope))):
+            break
+        # secant on the fixed point; a plain step where the secant is undefined
+        change=step-newStep
+        safe=np.abs(change)>np.abs(newStep)*1e-12
+        secant=np.where(safe, newStep*(slope-previous)/np.where(safe, change, 1), newStep)
+        previous, step, slope=slope, newStep, slope+secant
+    return weightedLinearFit(x, y, np.sqrt(dy2+slope[..., None]**2*dx2))
+
+
+@profiled("solve")
+def weightedPolyFit(x, y, dy, degree):
+    '''Best-fit poly args of the given degree by weighted least squares.
+    Like weightedLinearFit, but for any degree: the weighted Vandermonde
+    matrix is solved by QR, for one dataset or a (B, N) stack at once.
+    Points with infinite dy get zero weight.
+    Returns (args, cov, chi2) with args of shape (..., degree+1) in the
+    order poly expects.
+    '''
+    x, y, dy=np.broadcast_arrays(np.asarray(x, dtype=float), np.asarray(y, dtype=float),
+                                 np.asarray(dy, dtype=float))
+    sw=1/dy
+    V=x[..., None]**np.arange(degree+1)
+    Q, R=np.linalg.qr(V*sw[..., None])
+    Qty=np.einsum('...nk,...n->...k', Q, y*sw)
+    args=np.linalg.solve(R, Qty[..., None])[..., 0]
+    Rinv=np.linalg.inv(R)
+    cov=Rinv@np.swapaxes(Rinv, -1, -2)
+    residuals=np.einsum('...nk,...k->...n', V, args)-y
+    dof=np.sum(sw>0, axis=-1)-(degree+1)
+    chi2=np.sum((residuals*sw)**2, axis=-1)/dof
+    return args, cov, chi2
@@ -0,0 +1,49 @@
+'''
+Cold import time of the fitting modules, each in a fresh interpreter.
+
+    python importtime.py
+
+Fails if a module takes longer than BUDGET seconds to import, or if
+importing it pulls in a plotting or notebook package; those are only
+imported once a plot is actually made.
+'''
+import json
+import subprocess
+import sys
+
+MODULES=("fitting", "landscape", "replicates", "batchfit", "modelselect", "dataset",
+         "residualplot", "resample", "nonlinear",
+         "storage", "lodplot", "online",
+         "robust", "polydegree", "profiling", "diagnostics", "fitcache", "outofcore", "ingest")
+HEAVY=("matplotlib", "ipywidgets", "IPython", "pandas")
+BUDGET=0.5
+
+_PROBE='''
+import json, sys, time
+start=time.perf_counter()
+import %s
+elapsed=time.perf_counter()-start
+print(json.dumps([elapsed, [name for name in %r if name in sys.modules]]))
+'''
+
+
+def importTime(module):
+    '''(seconds, heavy packages loaded) for importing module in a new interpreter.'''
+    out=subprocess.run([sys.executable, "-c", _PROBE%(module, HEAVY)],
+                       check=True, capture_output=True, text=True).stdout
+    return tuple(json.loads(out))
+
+
+def main():
+    failed=False
+    for module in MODULES:
+        seconds, heavy=importTime(module)
+        ok=seconds<=BUDGET and not heavy
+        failed|=not ok
+        print("%-14s %6.3f s %s%s"%(module, seconds, "ok" if ok else "FAIL",
+                                    " (imports %s)"%", ".join(heavy) if heavy else ""))
+    return 1 if failed else 0
+
+
+if __name__=="__main__":
+    sys.exit(main())
@@ -0,0 +1,193 @@
+'''
+Reading (extensions, forces) batches from many rigs at once and fitting
+each as it arrives.
+
+A batch is what the Lecture6 notebook builds by hand: the extensions x
+and a forces matrix with one row per extension and one column per trial.
+Each batch is reduced to y (mean force) and dy (standard uncertainty of
+the mean) and fit with a weighted line in an executor, so the event loop
+only moves data. Sources are async iterables of batches, or of lines of
+the newline-delimited JSON the rigs send,
+    {"x": [...], "forces": [[...], ...]}
+which lineSource and fileSource read from a socket (an asyncio
+StreamReader) or a file. Lines are decoded by the pipeline, so a
+malformed one is recorded as an error of its source and reading goes on.
+
+Readers put batches on a bounded queue, so when the fits fall behind,
+reading stops (and a socket's flow control slows the sender) instead of
+memory growing without limit.
+'''
+import asyncio
+from collections import deque
+import inspect
+import json
+import time
+
+import numpy as np
+
+from fitting import weightedLinearFit
+from replicates import ReplicateStats
+
+LATENCIES=1000
+
+
+def reduceAndFit(x, forces):
+    '''y and dy of a forces matrix and the weighted line through them.
+    Runs in the executor, so it must stay a module-level function.
+    '''
+    if np.ndim(forces)!=2 or len(forces)!=len(x):
+        raise ValueError("forces must have one row per extension, got shape %s for %d extensions"
+                         %(np.shape(forces), len(x)))
+    stats=ReplicateStats().add(forces)
+    y, dy=stats.y, stats.dy
+    args, cov, chi2=weightedLinearFit(x, y, dy)
+    return {"y": y, "dy": dy, "intercept": args[0], "slope": args[1],
+            "dintercept": np.sqrt(cov[0, 0]), "dslope": np.sqrt(cov[1, 1]), "chi2": chi2}
+
+
+def _batch(line):
+    message=json.loads(line)
+    return np.asarray(message["x"], dtype=float), np.asarray(message["forces"], dtype=float)
+
+
+async def lineSource(reader):
+    '''The non-blank lines of an asyncio StreamReader, one JSON message each.
+    Keep the connection's StreamWriter referenced while reading: once it
+    is garbage collected the socket is closed.
+    '''
+    async for line in reader:
+        if line.strip():
+            yield line
+
+
+async def fileSource(path):
+    '''The non-blank lines of a file of JSON messages, read in a thread.'''
+    with open(path) as f:
+        while True:
+            line=await asyncio.to_thread(f.readline)
+            if not line:
+                return
+            if line.strip():
+                yield line
+
+
+class IngestPipeline:
+    '''Fits every batch of every source with reduceAndFit in executor (the
+    event loop's default thread pool when None; a ProcessPoolExecutor
+    keeps the fits off the GIL) by workers concurrent tasks, with at most
+    queueSize batches read but not yet started.
+    publish, if given, is called (or awaited, for a coroutine function)
+    with each result dict: the reduceAndFit values plus source, sequence
+    (the batch's position in its source), received, and the seconds spent
+    waiting in the queue, fitting and in total (latency).
+    results holds the result of the newest batch of each source fit so
+    far (by sequence, not by when its fit finished), errors the problems
+    met with each (bad lines, failed fits and exceptions from publish),
+    and metrics() summarizes the latencies.
+    '''
+
+    def __init__(self, executor=None, workers=4, queueSize=64, publish=None):
+        self.executor=executor
+        self.workers=workers
+        self.queueSize=queueSize
+        self.publish=publish
+        self.results={}
+        self.errors={}
+        self._counts={}
+        self._latencies={}
+
+    def _error(self, name, error):
+        self.errors.setdefault(name, []).append(repr(error))
+
+    async def _read(self, name, source, queue):
+        sequence=0
+        try:
+            async for item in source:
+                received=time.perf_counter()
+                if isinstance(item, (str, bytes)):
+                    try:
+                        item=_batch(item)
+                    except (ValueError, KeyError, TypeError) as error:
+                        self._error(name, error)
+                        continue
+                x, forces=item
+                await queue.put((name, sequence, received, x, forces))
+                sequence+=1
+        except Exception as error:
+            self._error(name, error)
+
+    async def _fit(self, queue):
+        loop=asyncio.get_running_loop()
+        while True:
+            item=await queue.get()
+            try:
+                if item is None:
+                    return
+                name, sequence, received, x, forces=item
+                started=time.perf_counter()
+                try:
+                    result=await loop.run_in_executor(self.executor, reduceAndFit, x, forces)
+                except Exception as error:
+                    self._error(name, error)
+                    continue
+                done=time.perf_counter()
+                result.update(source=name, sequence=sequence, received=received,
+                              wait=started-received, compute=done-started, latency=done-received)
+                self._record(result)
+                if self.publish is not None:
+                    # a failing publish must not end the fitter, or the
+                    # readers would wait on a full queue for ever
+                    try:
+                        published=self.publish(result)
+                        if inspect.isawaitable(published):
+                            await published
+                    except Exception as error:
+                        self._error(name, error)
+            finally:
+                queue.task_done()
+
+    def _record(self, result):
+        name=result["source"]
+        # with several fitters a batch can finish after a newer one
+        latest=self.results.get(name)
+        if latest is None or result["sequence"]>latest["sequence"]:
+            self.results[name]=result
+        self._counts[name]=self._counts.get(name, 0)+1
+        self._latencies.setdefault(name, deque(maxlen=LATENCIES)).append(
+            (result["latency"], result["wait"], result["compute"]))
+
+    async def run(self, sources):
+        '''Reads every source (a dict of name -> async iterable of
+        (x, forces) batches) to the end, fitting as batches arrive.
+        Returns results.
+        '''
+        queue=asyncio.Queue(maxsize=self.queueSize)
+        fitters=[asyncio.create_task(self._fit(queue)) for _ in range(self.workers)]
+        try:
+            await asyncio.gather(*(self._read(name, source, queue)
+                                   for name, source in sources.items()))
+            for _ in fitters:
+                await queue.put(None)
+            await asyncio.gather(*fitters)
+        finally:
+            for task in fitters:
+                task.cancel()
+        return self.results
+
+    def metrics(self):
+        '''Source name -> batches fit, errors, and the mean, median, 95th
+        percentile and largest latency, queue wait and fit time in seconds
+        over (up to) the last LATENCIES batches.
+        '''
+        summary={}
+        for name, count in self._counts.items():
+            latency, wait, compute=np.array(self._latencies[name]).T
+            summary[name]={"batches": count, "errors": len(self.errors.get(name, ())),
+                           "latency": float(np.mean(latency)),
+                           "latency50": float(np.percentile(latency, 50)),
+                           "latency95": float(np.percentile(latency, 95)),
+                           "latencyMax": float(np.max(latency)),
+                           "wait": float(np.mean(wait)), "compute": float(np.mean(compute))}
+        for name, errors in self.errors.items():
+            summary.setdefault(name, {"batches": 0, "errors": len(errors)})
+        return summary
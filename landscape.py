@@ -0,0 +1,105 @@
+'''
+The chi-squared surface over the intercept and slope slider ranges.
+'''
+import numpy as np
+
+from fitting import chiSquaredBatch, linear
+
+
+def sliderValues(bounds):
+    '''The values an interact (min, max, step) slider can take, max included.'''
+    low, high, step=bounds
+    return low+step*np.arange(int(round((high-low)/step))+1)
+
+
+class ChiSquaredGrid:
+    '''chiSquared of f(x, [intercept, slope]) at every point of the slider grid.
+    intercept and slope are (min, max, step) tuples, as passed to interact.
+    The surface is computed once, on first use, in chunks of at most
+    maxElements residuals; after that value() is a table lookup.
+    '''
+
+    def __init__(self, x, y, dy, f=linear, intercept=(-5, 20, .1), slope=(-1, 10, .1),
+                 maxElements=2**22):
+        self.x=np.asarray(x, dtype=float)
+        self.y=np.asarray(y, dtype=float)
+        self.dy=np.asarray(dy, dtype=float)
+        self.f=f
+        self.interceptBounds=intercept
+        self.slopeBounds=slope
+        self.intercepts=sliderValues(intercept)
+        self.slopes=sliderValues(slope)
+        self.maxElements=maxElements
+        self._surface=None
+
+    @property
+    def surface(self):
+        '''Reduced chi-squared, shape (len(intercepts), len(slopes)).'''
+        if self._surface is None:
+            self._surface=self._evaluate()
+        return self._surface
+
+    def _evaluate(self):
+        A, B=np.meshgrid(self.intercepts, self.slopes, indexing='ij')
+        params=np.stack([A.ravel(), B.ravel()], axis=-1)
+        chunk=max(1, self.maxElements//len(self.x))
+        surface=np.empty(len(params))
+        for start in range(0, len(params), chunk):
+            surface[start:start+chunk]=chiSquaredBatch(self.x, self.y, self.dy, self.f,
+                                                       params[start:start+chunk])
+        return surface.reshape(A.shape)
+
+    def index(self, intercept, slope):
+        '''Grid indices of the slider position closest to (intercept, slope).'''
+        i=int(round((intercept-self.interceptBounds[0])/self.interceptBounds[2]))
+        j=int(round((slope-self.slopeBounds[0])/self.slopeBounds[2]))
+        return (min(max(i, 0), len(self.intercepts)-1),
+                min(max(j, 0), len(self.slopes)-1))
+
+    def value(self, intercept, slope):
+        '''chiSquared at a slider position, read from the cached surface.'''
+        return self.surface[self.index(intercept, slope)]
+
+    def lookup(self, intercept, slope):
+        '''value() if (intercept, slope) is a slider position, else None
+        (for a value typed into the slider's box between grid points or
+        outside the range).
+        '''
+        i, j=self.index(intercept, slope)
+        if (abs(self.intercepts[i]-intercept)<=1e-6*self.interceptBounds[2]
+                and abs(self.slopes[j]-slope)<=1e-6*self.slopeBounds[2]):
+            return self.surface[i, j]
+        return None
+
+    def minimum(self):
+        '''(intercept, slope, chi-squared) at the lowest point of the grid.'''
+        i, j=np.unravel_index(np.argmin(self.surface), self.surface.shape)
+        return self.intercepts[i], self.slopes[j], self.surface[i, j]
+
+    def deltaChiSquared(self):
+        '''Unreduced chi-squared above the grid minimum.
+        The surface is divided by N - 2 degrees of freedom, so it is scaled
+        back up before comparing with the usual delta chi-squared levels.
+        '''
+        return (self.surface-self.surface.min())*(len(self.x)-2)
+
+    def confidenceRegion(self, delta=1):
+        '''Boolean mask of the grid points within delta of the minimum chi-squared.
+        delta=1 gives the one standard error range of each parameter.
+        '''
+        return self.deltaChiSquared()<=delta
+
+    def contour(self, ax=None, levels=(1, 2.3, 6.17)):
+        '''Draws delta chi-squared contours (by default 1, and the 68% and 95%
+        joint regions for two parameters) with slope on x and intercept on y.
+        '''
+        import matplotlib.pyplot as plt
+        if ax is None:
+            ax=plt.gca()
+        cs=ax.contour(self.slopes, self.intercepts, self.deltaChiSquared(), levels=levels)
+        ax.clabel(cs)
+        best=self.minimum()
+        ax.plot(best[1], best[0], '+k')
+        ax.set_xlabel("slope")
+        ax.set_ylabel("intercept")
+        return cs
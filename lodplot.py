@@ -0,0 +1,127 @@
+'''
+Level-of-detail errorbar plots for datasets with far more points than
+the axes have pixels.
+
+Only a few points per pixel column of the visible x range are drawn: in
+each column, the points with the lowest and highest y, y - dy and y + dy.
+Those are exactly the points that decide what the column looks like, so
+outliers and the full extent of the error bars stay visible. Zooming or
+panning recomputes the points for the new range.
+'''
+import time
+
+import numpy as np
+
+from profiling import profiled
+
+
+def _extremes(starts, group, values):
+    '''Indices of the smallest and largest value in each run of equal bins.
+    starts are the first index of each run and group the run of each value.
+    '''
+    keep=[]
+    for reduce in (np.minimum, np.maximum):
+        hits=np.flatnonzero(values==reduce.reduceat(values, starts)[group])
+        keep.append(hits[np.unique(group[hits], return_index=True)[1]])
+    return keep
+
+
+def decimate(x, y, dy, low, high, pixels):
+    '''Indices of the points to draw for the x range [low, high] spread over
+    pixels columns, in increasing x order. x must be sorted.
+    '''
+    first=np.searchsorted(x, low, side='left')
+    stop=np.searchsorted(x, high, side='right')
+    if stop-first<=4*pixels:
+        return np.arange(first, stop)
+    xv=x[first:stop]
+    if high>low:
+        bins=((xv-low)*(pixels/(high-low))).astype(np.intp)
+    else:
+        # every point is at the one x the range holds: a single column
+        bins=np.zeros(len(xv), dtype=np.intp)
+    change=np.flatnonzero(np.diff(bins))+1
+    starts=np.concatenate([[0], change])
+    group=np.zeros(len(xv), dtype=np.intp)
+    group[change]=1
+    np.cumsum(group, out=group)
+    yv=y[first:stop]
+    dyv=dy[first:stop]
+    keep=[[0, len(xv)-1]]
+    for values in (yv, yv-dyv, yv+dyv):
+        keep.extend(_extremes(starts, group, values))
+    return first+np.unique(np.concatenate(keep))
+
+
+class DecimatedErrorbar:
+    '''An ax.errorbar plot that only draws what the axes can show.
+    Keyword arguments go to ax.errorbar. timings holds one entry per draw:
+    the seconds spent choosing points and drawing the error bars, and the
+    number of points drawn. Set report=True to print them as they happen.
+    '''
+
+    def __init__(self, ax, x, y, dy, fmt='.', report=False, **kwargs):
+        order=np.argsort(x, kind='stable')
+        self.x=np.asarray(x, dtype=float)[order]
+        self.y=np.asarray(y, dtype=float)[order]
+        self.dy=np.broadcast_to(np.asarray(dy, dtype=float), np.shape(x))[order]
+        self.ax=ax
+        self.report=report
+        self.timings=[]
+        self._decimateSeconds=0.0
+
+        start=time.perf_counter()
+        shown=decimate(self.x, self.y, self.dy, self.x[0], self.x[-1], self._pixels())
+        self._decimateSeconds=time.perf_counter()-start
+        self.container=ax.errorbar(self.x[shown], self.y[shown], self.dy[shown], fmt=fmt,
+                                   **kwargs)
+        self.markers=self.container.lines[0]
+        # with capsize, the lower and upper caps
+        self.caps=self.container.lines[1]
+        self.bars=self.container.lines[2][0]
+        self._shown=len(shown)
+        self._wrapDraw(self.bars)
+        ax.callbacks.connect('xlim_changed', self._limitsChanged)
+
+    def _pixels(self):
+        return max(1, int(self.ax.get_window_extent().width))
+
+    @profiled("plot")
+    def _limitsChanged(self, ax):
+        low, high=sorted(ax.get_xlim())
+        start=time.perf_counter()
+        shown=decimate(self.x, self.y, self.dy, low, high, self._pixels())
+        self._decimateSeconds=time.perf_counter()-start
+        self._shown=len(shown)
+        x=self.x[shown]
+        y=self.y[shown]
+        dy=self.dy[shown]
+        self.markers.set_data(x, y)
+        if self.caps:
+            lower, upper=self.caps
+            lower.set_data(x, y-dy)
+            upper.set_data(x, y+dy)
+        segments=np.empty((len(shown), 2, 2))
+        segments[:, :, 0]=x[:, None]
+        segments[:, 0, 1]=y-dy
+        segments[:, 1, 1]=y+dy
+        self.bars.set_segments(segments)
+
+    def _wrapDraw(self, artist):
+        draw=artist.draw
+
+        def timedDraw(renderer):
+            start=time.perf_counter()
+            draw(renderer)
+            timing={"decimate": self._decimateSeconds, "draw": time.perf_counter()-start,
+                    "points": self._shown}
+            self.timings.append(timing)
+            if self.report:
+                print("%d of %d points: %.1f ms decimating, %.1f ms drawing error bars"
+                      %(self._shown, len(self.x), 1000*timing["decimate"], 1000*timing["draw"]))
+        artist.draw=timedDraw
+
+
+def decimatedErrorbar(ax, x, y, dy, fmt='.', **kwargs):
+    '''Shorthand for DecimatedErrorbar(ax, x, y, dy, fmt, **kwargs).'''
+    return DecimatedErrorbar(ax, x, y, dy, fmt=fmt, **kwargs)
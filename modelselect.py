@@ -0,0 +1,89 @@
+'''
+Choosing between a linear, exponential and power law relationship.
+
+Each model is a straight line after a transform: y vs x, ln y vs x and
+ln y vs ln x. ln x, ln y and d ln y = dy/y are computed once, and the
+semi-log and log-log fits share their weights and ln y sums, which only
+leaves the x sums to do per model.
+'''
+import numpy as np
+
+from fitting import lineFromSums
+from profiling import profiled
+
+
+MODELS=("linear", "exponential", "power law")
+
+
+def _centredFit(w, S, ybar, Syy, X, Y):
+    '''Weighted line through (X, Y) given the shared y-side sums.
+    Returns intercept, slope, their covariance terms and the chi-squared
+    (not reduced).
+    '''
+    xbar=np.sum(w*X, axis=-1)/S
+    t=X-xbar[..., None]
+    Stt=np.sum(w*t*t, axis=-1)
+    Sty=np.sum(w*t*(Y-ybar[..., None]), axis=-1)
+    args, cov=lineFromSums(S, xbar, ybar, Stt, Sty)
+    chi2=np.maximum(Syy-args[..., 1]*Sty, 0)
+    return args[..., 0], args[..., 1], cov[..., 0, 0], cov[..., 1, 1], chi2
+
+
+def _ySums(w, Y):
+    S=np.sum(w, axis=-1)
+    ybar=np.sum(w*Y, axis=-1)/S
+    Syy=np.sum(w*(Y-ybar[..., None])**2, axis=-1)
+    return S, ybar, Syy
+
+
+@profiled("selectModel")
+def selectModel(x, y, dy, lnx=None, lny=None, weights=None, lnWeights=None):
+    '''Fits y = A + Bx, y = Ae^(Bx) and y = Ax^B by linearization and ranks them.
+    x, y and dy are (N,) arrays, or (..., N) stacks of series fitted together.
+    Returns a dict of arrays whose last axis follows MODELS:
+    A, B and their uncertainties dA, dB (A = e^intercept for the two
+    log fits), chi2 (reduced), aic and bic; plus best, the index of the
+    model with the lowest reduced chi-squared, and rank, the model
+    indices from best to worst.
+    All three models have two parameters, so aic and bic rank them the
+    same way as chi2 for a given series.
+    lnx, lny and the weights 1/dy**2 and 1/(d ln y)**2 can be passed in
+    when they have already been computed.
+    '''
+    x, y, dy=np.broadcast_arrays(np.asarray(x, dtype=float), np.asarray(y, dtype=float),
+                                 np.asarray(dy, dtype=float))
+    n=x.shape[-1]
+    lnx=np.log(x) if lnx is None else lnx
+    lny=np.log(y) if lny is None else lny
+
+    w=1/dy**2 if weights is None else weights
+    S, ybar, Syy=_ySums(w, y)
+    fits=[_centredFit(w, S, ybar, Syy, x, y)]
+    # d ln y = dy/y
+    wln=(y/dy)**2 if lnWeights is None else lnWeights
+    S, ybar, Syy=_ySums(wln, lny)
+    fits.append(_centredFit(wln, S, ybar, Syy, x, lny))
+    fits.append(_centredFit(wln, S, ybar, Syy, lnx, lny))
+
+    intercept, slope, varIntercept, varSlope, chi2=(np.stack(column, axis=-1)
+                                                    for column in zip(*fits))
+    A=intercept.copy()
+    A[..., 1:]=np.exp(intercept[..., 1:])
+    dA=np.sqrt(varIntercept)
+    dA[..., 1:]*=A[..., 1:]
+    k=2
+    rank=np.argsort(chi2, axis=-1, kind='stable')
+    return {"A": A, "B": slope, "dA": dA, "dB": np.sqrt(varSlope),
+            "chi2": chi2/(n-k), "aic": chi2+2*k, "bic": chi2+k*np.log(n),
+            "best": rank[..., 0], "rank": rank}
+
+
+def evaluateModel(model, x, A, B):
+    '''Value of the named model (one of MODELS) at x.'''
+    if model=="linear":
+        return A+B*x
+    if model=="exponential":
+        return A*np.exp(B*x)
+    if model=="power law":
+        return A*x**B
+    raise ValueError("unknown model %r, expected one of %s"%(model, ", ".join(MODELS)))
@@ -0,0 +1,111 @@
+'''
+Direct least-squares fits of y = A x^B and y = A e^(Bx).
+
+Fitting ln y instead, with d ln y = dy/y, is only a first order
+approximation and biases A and B when dy/y is large. Here chi-squared is
+minimized in y itself with Levenberg-Marquardt, starting from the
+linearized fit. Both parameters have analytic derivatives, so each step
+is a closed-form 2x2 solve, done for a whole (B, N) stack of series at
+once.
+'''
+import numpy as np
+
+from fitting import exponential, powerLaw, weightedLinearFit
+
+
+def _powerLawJacobian(x, args, fx):
+    '''d f/d A and d f/d B of A x^B, given f(x).'''
+    return x**args[1], fx*np.log(x)
+
+
+def _exponentialJacobian(x, args, fx):
+    '''d f/d A and d f/d B of A e^(Bx), given f(x).'''
+    return np.exp(args[1]*x), fx*x
+
+
+def _linearizedStart(X, y, dy):
+    '''A and B from a weighted line through ln y; points with y <= 0 are left out.'''
+    positive=y>0
+    lny=np.log(np.where(positive, y, 1))
+    dlny=np.where(positive, dy/np.abs(y), np.inf)
+    args, _, _=weightedLinearFit(X, lny, dlny)
+    return np.stack([np.exp(args[..., 0]), args[..., 1]], axis=-1)
+
+
+def levenbergMarquardt(f, jacobian, x, y, dy, start, maxIterations=50, tol=1e-10):
+    '''Minimizes chiSquared of the two parameter model f for every series.
+    jacobian(x, args, fx) returns the derivatives of f with respect to
+    args[0] and args[1]. start has shape (..., 2).
+    Each series keeps its own damping and stops updating once its
+    chi-squared changes by less than tol (relative) in an accepted step.
+    Returns a dict with args (..., 2), cov, chi2 (reduced), iterations
+    and converged.
+    '''
+    x, y, dy=np.broadcast_arrays(np.asarray(x, dtype=float), np.asarray(y, dtype=float),
+                                 np.asarray(dy, dtype=float))
+    w=1/dy**2
+    p=np.array(start, dtype=float)
+    batch=p.shape[:-1]
+
+    def evaluate(p):
+        args=(p[..., 0, None], p[..., 1, None])
+        fx=f(x, args)
+        return args, fx, np.sum(w*(y-fx)**2, axis=-1)
+
+    args, fx, chi2=evaluate(p)
+    damping=np.full(batch, 1e-3)
+    converged=np.zeros(batch, dtype=bool)
+    iterations=np.zeros(batch, dtype=int)
+    for _ in range(maxIterations):
+        if converged.all():
+            break
+        dA, dB=jacobian(x, args, fx)
+        r=y-fx
+        a=np.sum(w*dA*dA, axis=-1)
+        b=np.sum(w*dA*dB, axis=-1)
+        c=np.sum(w*dB*dB, axis=-1)
+        gA=np.sum(w*dA*r, axis=-1)
+        gB=np.sum(w*dB*r, axis=-1)
+        # (J^T W J + damping diag(J^T W J)) step = J^T W r, solved in closed form
+        a1=a*(1+damping)
+        c1=c*(1+damping)
+        det=a1*c1-b*b
+        step=np.stack([(c1*gA-b*gB)/det, (a1*gB-b*gA)/det], axis=-1)
+        step[converged]=0
+        trial=p+step
+        _, trialFx, trialChi2=evaluate(trial)
+        better=(trialChi2<=chi2)&~converged&np.isfinite(trialChi2)
+        iterations+=~converged
+        converged|=better&(chi2-trialChi2<=tol*chi2)
+        p=np.where(better[..., None], trial, p)
+        fx=np.where(better[..., None], trialFx, fx)
+        chi2=np.where(better, trialChi2, chi2)
+        args=(p[..., 0, None], p[..., 1, None])
+        damping=np.where(better, damping/10, damping*10)
+
+    dA, dB=jacobian(x, args, fx)
+    a=np.sum(w*dA*dA, axis=-1)
+    b=np.sum(w*dA*dB, axis=-1)
+    c=np.sum(w*dB*dB, axis=-1)
+    det=a*c-b*b
+    cov=np.stack([np.stack([c, -b], axis=-1),
+                  np.stack([-b, a], axis=-1)], axis=-2)/det[..., None, None]
+    return {"args": p, "cov": cov, "chi2": chi2/(x.shape[-1]-2),
+            "iterations": iterations, "converged": converged}
+
+
+def fitPowerLaw(x, y, dy, **options):
+    '''Direct fit of y = A x^B, started from the log-log fit.
+    x, y and dy are (N,) arrays or (B, N) stacks; options go to
+    levenbergMarquardt. args[..., 0] is A and args[..., 1] is B.
+    '''
+    x=np.asarray(x, dtype=float)
+    start=_linearizedStart(np.log(x), np.asarray(y, dtype=float), np.asarray(dy, dtype=float))
+    return levenbergMarquardt(powerLaw, _powerLawJacobian, x, y, dy, start, **options)
+
+
+def fitExponential(x, y, dy, **options):
+    '''Direct fit of y = A e^(Bx), started from the semi-log fit.'''
+    x=np.asarray(x, dtype=float)
+    start=_linearizedStart(x, np.asarray(y, dtype=float), np.asarray(dy, dtype=float))
+    return levenbergMarquardt(exponential, _exponentialJacobian, x, y, dy, start, **options)
@@ -0,0 +1,150 @@
+'''
+Weighted straight-line fit kept up to date as points arrive.
+
+Only the weighted sums S, Sx, Sy, Sxx, Sxy and Syy are stored, so adding
+or removing a point and asking for the fit both take constant time
+(except removing from a window, see OnlineLinearFit.remove).
+'''
+from collections import deque
+
+import numpy as np
+
+from fitting import lineFromSums
+
+
+class OnlineLinearFit:
+    '''Running weighted least-squares line, with weights 1/dy**2.
+    window, if given, keeps only the latest window points: adding one more
+    removes the oldest. x and y are stored relative to the first point
+    added, which keeps the sums well conditioned when the readings have a
+    large offset. Removing points subtracts from the sums; with a window
+    the sums are rebuilt from the kept points every window removals so
+    rounding errors cannot build up.
+    '''
+
+    def __init__(self, window=None):
+        self.window=window
+        self.points=deque() if window else None
+        self._removals=0
+        self.clear()
+
+    def clear(self):
+        '''Forgets every point.'''
+        self.origin=None
+        self.n=0
+        self.S=self.Sx=self.Sy=self.Sxx=self.Sxy=self.Syy=0.0
+        if self.points is not None:
+            self.points.clear()
+
+    def _accumulate(self, x, y, dy, sign):
+        if self.origin is None:
+            self.origin=(float(np.ravel(x)[0]), float(np.ravel(y)[0]))
+        x=np.asarray(x, dtype=float)-self.origin[0]
+        y=np.asarray(y, dtype=float)-self.origin[1]
+        w=np.broadcast_to(1/np.asarray(dy, dtype=float)**2, x.shape)
+        wx=w*x
+        wy=w*y
+        self.n+=sign*x.size
+        self.S+=sign*float(np.sum(w))
+        self.Sx+=sign*float(np.sum(wx))
+        self.Sy+=sign*float(np.sum(wy))
+        self.Sxx+=sign*float(np.sum(wx*x))
+        self.Sxy+=sign*float(np.sum(wx*y))
+        self.Syy+=sign*float(np.sum(wy*y))
+
+    def _accumulatePoint(self, x, y, dy, sign):
+        '''_accumulate for a single reading, in plain floats.'''
+        if self.origin is None:
+            self.origin=(x, y)
+        x-=self.origin[0]
+        y-=self.origin[1]
+        w=sign/(dy*dy)
+        wx=w*x
+        wy=w*y
+        self.n+=sign
+        self.S+=w
+        self.Sx+=wx
+        self.Sy+=wy
+        self.Sxx+=wx*x
+        self.Sxy+=wx*y
+        self.Syy+=wy*y
+
+    def add(self, x, y, dy):
+        '''Adds one point, or arrays of points.'''
+        if np.ndim(x)==0:
+            point=(float(x), float(y), float(dy))
+            self._accumulatePoint(*point, 1)
+            if self.points is not None:
+                self.points.append(point)
+        else:
+            self._accumulate(x, y, dy, 1)
+            if self.points is not None:
+                self.points.extend(zip(np.ravel(x).tolist(), np.ravel(y).tolist(),
+                                       np.broadcast_to(dy, np.shape(x)).ravel().tolist()))
+        if self.points is not None:
+            while len(self.points)>self.window:
+                self._accumulatePoint(*self.points.popleft(), -1)
+                self._removals+=1
+            if self._removals>=self.window:
+                self._rebuild()
+        return self
+
+    def remove(self, x, y, dy):
+        '''Removes points that were added before.
+        With a window they must still be in it, and they leave it; finding
+        them is a linear search, so each call takes O(window) time.
+        Without a window nothing is checked: removing a point that was
+        never added silently leaves the sums describing no real data.
+        '''
+        if np.ndim(x)==0:
+            points=[(float(x), float(y), float(dy))]
+        else:
+            points=list(zip(np.ravel(x).tolist(), np.ravel(y).tolist(),
+                            np.broadcast_to(dy, np.shape(x)).ravel().tolist()))
+        if self.points is not None:
+            kept=deque(self.points)
+            for point in points:
+                try:
+                    kept.remove(point)
+                except ValueError:
+                    raise ValueError("point %r is not in the window"%(point,)) from None
+            self.points=kept
+            self._removals+=len(points)
+        if np.ndim(x)==0:
+            self._accumulatePoint(*points[0], -1)
+        else:
+            self._accumulate(x, y, dy, -1)
+        if self.n==0:
+            self.clear()
+        return self
+
+    def _rebuild(self):
+        points=list(self.points)
+        self._removals=0
+        self.origin=None
+        self.n=0
+        self.S=self.Sx=self.Sy=self.Sxx=self.Sxy=self.Syy=0.0
+        if points:
+            x, y, dy=zip(*points)
+            self._accumulate(x, y, dy, 1)
+
+    def fit(self):
+        '''(args, cov, chi2) as returned by fitting.weightedLinearFit.'''
+        if self.n<2:
+            raise ValueError("a line needs at least 2 points, there are %d"%self.n)
+        x0, y0=self.origin
+        xbar=self.Sx/self.S
+        ybar=self.Sy/self.S
+        Stt=self.Sxx-self.Sx*xbar
+        Sty=self.Sxy-xbar*self.Sy
+        args, cov=lineFromSums(self.S, xbar+x0, ybar+y0, Stt, Sty)
+        chi2=max(self.Syy-self.Sy*ybar-args[1]*Sty, 0.0)/(self.n-2) if self.n>2 else np.nan
+        return args, cov, chi2
+
+    @property
+    def intercept(self):
+        return self.fit()[0][0]
+
+    @property
+    def slope(self):
+        return self.fit()[0][1]
@@ -0,0 +1,130 @@
+'''
+Weighted line and polynomial fits of series too long to hold in memory.
+
+The data are read a chunk of points at a time, from memory-mapped arrays
+(such as the columns of a storage bundle) or from any source that can
+produce its chunks again. The first pass only finds the x range, the
+second folds each chunk's weighted Vandermonde rows into a small R factor
+(a QR of the previous R stacked on the chunk), and the third evaluates
+the fit for chi-squared and residual summaries. Memory use is set by the
+chunk size and the degree, not by N.
+'''
+import math
+
+import numpy as np
+
+from fitting import poly, powerMatrix
+from profiling import profiled, stage
+from storage import readColumns
+
+
+def arrayChunks(x, y, dy, chunk=2**16):
+    '''A source of chunks of x, y and dy, which may be memory-mapped;
+    dy can also be a scalar. Calling it starts a new pass over the data.
+    '''
+    n=len(x)
+
+    def chunks():
+        for start in range(0, n, chunk):
+            stop=min(start+chunk, n)
+            yield (x[start:stop], y[start:stop],
+                   dy if np.ndim(dy)==0 else dy[start:stop])
+    return chunks
+
+
+def bundleChunks(path, chunk=2**16):
+    '''arrayChunks of the memory-mapped x, y and dy columns of a bundle.'''
+    columns=readColumns(path, ("x", "y", "dy"))
+    return arrayChunks(columns["x"], columns["y"], columns["dy"], chunk)
+
+
+def _chunks(source):
+    for x, y, dy in source():
+        x=np.asarray(x, dtype=float)
+        yield x, np.asarray(y, dtype=float), np.broadcast_to(np.asarray(dy, dtype=float), x.shape)
+
+
+def chunkedPolyFit(source, degree=1, bounds=None):
+    '''Weighted least-squares poly args of the given degree over every
+    chunk of source, a function returning a new iterator of (x, y, dy)
+    chunks on each call (see arrayChunks and bundleChunks). bounds is the
+    (low, high) range of x if known, otherwise it takes one extra pass.
+    Points with infinite dy get zero weight.
+    Returns a dict with args (in the order poly expects), cov, chi2
+    (reduced), n, and summaries of the normalized residuals
+    (f(x)-y)/dy: mean, rms, largest (the one of largest size) and its
+    index, runs (of equal sign) and durbinWatson, as in
+    diagnostics.residualDiagnostics.
+    '''
+    size=degree+1
+    if bounds is None:
+        with stage("load"):
+            low, high=np.inf, -np.inf
+            for x, _, _ in _chunks(source):
+                if len(x):
+                    low=min(low, x.min())
+                    high=max(high, x.max())
+    else:
+        low, high=bounds
+    mid=(high+low)/2
+    half=(high-low)/2 or 1.0
+
+    # R of the weighted Vandermonde matrix in t=(x-mid)/half, with b=y/dy as
+    # an extra column, so R[:size, size] is Q^T b
+    with stage("solve"):
+        R=np.zeros((0, size+1))
+        for x, y, dy in _chunks(source):
+            t=(x-mid)/half
+            # Fortran order is what LAPACK works in, saving qr a copy
+            A=np.empty((len(R)+len(x), size+1), order='F')
+            A[:len(R)]=R
+            rows=A[len(R):]
+            np.divide(1, dy, out=rows[:, 0])
+            for k in range(1, size):
+                np.multiply(rows[:, k-1], t, out=rows[:, k])
+            np.multiply(y, rows[:, 0], out=rows[:, size])
+            R=np.linalg.qr(A, mode='r')
+        Rt=R[:size, :size]
+        argsT=np.linalg.solve(Rt, R[:size, size])
+        Rinv=np.linalg.inv(Rt)
+    M=powerMatrix(mid, half, size)
+    summary=_residualPass(source, argsT, mid, half)
+    dof=summary.pop("points")-size
+    summary.update(args=M@argsT, cov=M@(Rinv@Rinv.T)@M.T, chi2=summary.pop("chiSquared")/dof)
+    return summary
+
+
+@profiled("chiSquared")
+def _residualPass(source, argsT, mid, half):
+    '''Second pass: chi-squared and summaries of the normalized residuals.'''
+    squares=[]
+    total=0.0
+    n=points=runs=0
+    largest, largestIndex=0.0, -1
+    differences=[]
+    last=None
+    for x, y, dy in _chunks(source):
+        u=(poly((x-mid)/half, argsT)-y)/dy
+        weighted=np.isfinite(dy)
+        squares.append(float(np.sum(np.where(weighted, u*u, 0))))
+        total+=float(np.sum(u[weighted]))
+        points+=int(np.count_nonzero(weighted))
+        if len(u):
+            i=int(np.argmax(np.abs(u)))
+            if abs(u[i])>abs(largest):
+                largest, largestIndex=float(u[i]), n+i
+            joined=u if last is None else np.concatenate([[last], u])
+            runs+=int(np.count_nonzero((joined[1:]>0)!=(joined[:-1]>0)))+(last is None)
+            differences.append(float(np.sum(np.diff(joined)**2)))
+            last=u[-1]
+        n+=len(u)
+    chiSquared=math.fsum(squares)
+    return {"n": n, "points": points, "chiSquared": chiSquared, "mean": total/points,
+            "rms": math.sqrt(chiSquared/points), "largest": largest,
+            "largestIndex": largestIndex, "runs": runs,
+            "durbinWatson": math.fsum(differences)/chiSquared}
+
+
+def chunkedLinearFit(source, bounds=None):
+    '''chunkedPolyFit of degree 1; args are [intercept, slope].'''
+    return chunkedPolyFit(source, 1, bounds)
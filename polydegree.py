@@ -0,0 +1,67 @@
+'''
+Choosing the degree of a polynomial fit.
+
+The weighted Vandermonde matrix for the highest degree is factored once
+by QR, with the weighted data b=y/dy as one more column. Because a QR
+factorization of the first d+1 columns is just the leading block of the
+full one, every lower degree is read off the same factors. The last
+diagonal entry of R is the size of the highest degree's residual, and
+the chi-squared of degree d adds back the squared entries of Q^T b past
+d, so nothing is found as the small difference of two large sums.
+'''
+import numpy as np
+
+from fitting import powerMatrix
+
+CRITERIA=("aic", "bic")
+
+
+def selectDegree(x, y, dy, maxDegree=5, criterion="bic"):
+    '''Fits poly of every degree 0..maxDegree and picks one.
+    x is an (N,) array; y and dy are (N,) or (B, N) for B series.
+    x is mapped onto [-1, 1] before building the basis, which keeps the
+    factorization well conditioned, and the results are converted back.
+    Returns a dict with, along the degree axis:
+    args (..., maxDegree+1, maxDegree+1), row d holding the degree d args
+    in the order poly expects (zero past degree d), chi2 (reduced), aic,
+    bic and F, the F statistic for adding degree d to degree d-1 (nan for
+    degree 0); and best, the degree with the lowest criterion ("aic" or
+    "bic").
+    '''
+    if criterion not in CRITERIA:
+        raise ValueError("criterion must be one of %s, not %r"%(", ".join(CRITERIA), criterion))
+    x=np.asarray(x, dtype=float)
+    y=np.asarray(y, dtype=float)
+    dy=np.broadcast_to(np.asarray(dy, dtype=float), y.shape)
+    n=x.shape[-1]
+    size=maxDegree+1
+    if not 0<=maxDegree<n-1:
+        raise ValueError("maxDegree must be between 0 and N-2=%d so every degree has a reduced "
+                         "chi-squared, not %r"%(n-2, maxDegree))
+    low, high=x.min(), x.max()
+    mid=(high+low)/2
+    half=(high-low)/2 or 1.0
+    t=(x-mid)/half
+
+    sw=1/dy
+    A=np.concatenate([t[..., None]**np.arange(size)*sw[..., None], (y*sw)[..., None]],
+                     axis=-1)
+    R=np.linalg.qr(A, mode='r')
+    z=R[..., :size, size]
+    # chi-squared of degree d: the top degree's residual plus z[j]**2 for j > d
+    trailing=np.cumsum((z*z)[..., ::-1], axis=-1)[..., ::-1]
+    raw=R[..., size, size, None]**2+np.concatenate(
+        [trailing[..., 1:], np.zeros(z.shape[:-1]+(1,))], axis=-1)
+    k=np.arange(1, size+1)
+    chi2=raw/(n-k)
+    aic=raw+2*k
+    bic=raw+k*np.log(n)
+    F=np.full(raw.shape, np.nan)
+    F[..., 1:]=z[..., 1:]**2/chi2[..., 1:]
+
+    argsT=np.zeros(y.shape[:-1]+(size, size))
+    for d in range(size):
+        argsT[..., d, :d+1]=np.linalg.solve(R[..., :d+1, :d+1], z[..., :d+1, None])[..., 0]
+    args=argsT@powerMatrix(mid, half, size).T
+    best=np.argmin(aic if criterion=="aic" else bic, axis=-1)
+    return {"args": args, "chi2": chi2, "aic": aic, "bic": bic, "F": F, "best": best}
@@ -0,0 +1,126 @@
+'''
+Per-stage counters and timings for the fitting pipeline.
+
+Stages are marked with the profiled decorator or the stage context
+manager, e.g. "load", "transform", "solve", "chiSquared", "table" and
+"plot". Recording is off by default; turn it on with enable() or by
+setting FIT_PROFILE=1 in the environment. While off, a profiled
+function costs one flag check per call and stage() returns a shared
+do-nothing context.
+
+Each process records separately, so a process pool's workers are not
+included in the parent's numbers.
+'''
+from contextlib import contextmanager, nullcontext
+import functools
+import json
+import os
+import threading
+import time
+
+BUCKETS=40
+MAX_EVENTS=10**6
+
+_enabled=os.environ.get("FIT_PROFILE", "") not in ("", "0")
+_stats={}
+_events=[]
+_lock=threading.Lock()
+_idle=nullcontext()
+
+
+def enable():
+    global _enabled
+    _enabled=True
+
+
+def disable():
+    global _enabled
+    _enabled=False
+
+
+def enabled():
+    return _enabled
+
+
+def reset():
+    '''Forgets everything recorded so far.'''
+    with _lock:
+        _stats.clear()
+        del _events[:]
+
+
+def _record(name, start, stop):
+    duration=stop-start
+    # bucket b holds durations from 2**b to 2**(b+1) microseconds (b=0 also below 1 us)
+    bucket=min(BUCKETS-1, max(0, (duration//1000).bit_length()-1))
+    with _lock:
+        stats=_stats.get(name)
+        if stats is None:
+            stats=_stats[name]={"count": 0, "total": 0, "min": duration, "max": duration,
+                                "histogram": [0]*BUCKETS}
+        stats["count"]+=1
+        stats["total"]+=duration
+        stats["min"]=min(stats["min"], duration)
+        stats["max"]=max(stats["max"], duration)
+        stats["histogram"][bucket]+=1
+        if len(_events)<MAX_EVENTS:
+            _events.append((name, start, duration, threading.get_ident()))
+
+
+@contextmanager
+def _timed(name):
+    start=time.perf_counter_ns()
+    try:
+        yield
+    finally:
+        _record(name, start, time.perf_counter_ns())
+
+
+def stage(name):
+    '''Context manager timing the enclosed block as one call of stage name.'''
+    return _timed(name) if _enabled else _idle
+
+
+def profiled(name):
+    '''Decorator timing every call of a function as stage name.'''
+    def decorate(f):
+        @functools.wraps(f)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return f(*args, **kwargs)
+            start=time.perf_counter_ns()
+            try:
+                return f(*args, **kwargs)
+            finally:
+                _record(name, start, time.perf_counter_ns())
+        return wrapper
+    return decorate
+
+
+def summary():
+    '''Stage name -> count, total/min/max/mean seconds and the histogram of
+    call durations (counts per power-of-two bucket of microseconds).
+    '''
+    with _lock:
+        return {name: {"count": s["count"], "total": s["total"]/1e9, "min": s["min"]/1e9,
+                       "max": s["max"]/1e9, "mean": s["total"]/s["count"]/1e9,
+                       "histogram": list(s["histogram"])}
+                for name, s in _stats.items()}
+
+
+def exportJson(path):
+    '''Writes summary() to a JSON file.'''
+    with open(path, "w") as f:
+        json.dump(summary(), f, indent=1)
+
+
+def exportChromeTrace(path):
+    '''Writes every recorded call (up to MAX_EVENTS) as a Chrome trace,
+    for chrome://tracing or https://ui.perfetto.dev.
+    '''
+    pid=os.getpid()
+    with _lock:
+        events=[{"name": name, "ph": "X", "ts": start/1000, "dur": duration/1000,
+                 "pid": pid, "tid": tid} for name, start, duration, tid in _events]
+    with open(path, "w") as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
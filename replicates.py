@@ -0,0 +1,91 @@
+'''
+Mean and standard uncertainty of the mean of repeated trials, without
+holding every trial in memory.
+
+This replaces
+    y=np.mean(forces, axis=1)
+    dy=np.std(forces, axis=1, ddof=1)/np.sqrt(forces.shape[1])
+for a forces matrix that arrives a few trials (columns) at a time.
+'''
+import numpy as np
+
+
+class ReplicateStats:
+    '''Running count, mean and sum of squared deviations for each row
+    (extension) of a forces matrix, folded in with Welford/Chan updates.
+    ddof=1 gives the sample standard deviation, as in np.std(..., ddof=1);
+    this is the value the tutorial uses for dy.
+    Two ReplicateStats built from different trials can be merged, so each
+    worker process can reduce its own share and send the result back.
+    '''
+
+    def __init__(self, rows=None, ddof=1):
+        self.ddof=ddof
+        self.count=None
+        self.mean=None
+        self.m2=None
+        if rows is not None:
+            self._reset(rows)
+
+    def _reset(self, rows):
+        self.count=np.zeros(rows)
+        self.mean=np.zeros(rows)
+        self.m2=np.zeros(rows)
+
+    def add(self, trials):
+        '''Folds in a chunk of trials, an (extensions, trials) array like forces,
+        or a 1D array holding one trial per extension.
+        '''
+        trials=np.asarray(trials, dtype=float)
+        if trials.ndim==1:
+            trials=trials[:, None]
+        n=trials.shape[1]
+        if n==0:
+            return self
+        mean=np.mean(trials, axis=1)
+        m2=np.sum((trials-mean[:, None])**2, axis=1)
+        self._combine(np.full(len(trials), float(n)), mean, m2)
+        return self
+
+    def merge(self, other):
+        '''Folds in the trials already reduced by another ReplicateStats.'''
+        if other.count is not None:
+            self._combine(other.count, other.mean, other.m2)
+        return self
+
+    def _combine(self, count, mean, m2):
+        if self.count is None:
+            self._reset(len(count))
+        total=self.count+count
+        delta=mean-self.mean
+        share=np.divide(count, total, out=np.zeros_like(total), where=total>0)
+        self.mean=self.mean+delta*share
+        self.m2=self.m2+m2+delta**2*self.count*share
+        self.count=total
+
+    @property
+    def y(self):
+        '''Mean of the trials for each extension.'''
+        return self.mean
+
+    @property
+    def std(self):
+        '''Standard deviation of the trials for each extension.'''
+        return np.sqrt(self.m2/(self.count-self.ddof))
+
+    @property
+    def dy(self):
+        '''Standard uncertainty of the mean for each extension.'''
+        return self.std/np.sqrt(self.count)
+
+
+def aggregate(chunks, ddof=1):
+    '''Reduces an iterable (or generator) of trial chunks to (y, dy).
+    Raises ValueError when the chunks hold no trials at all.
+    '''
+    stats=ReplicateStats(ddof=ddof)
+    for chunk in chunks:
+        stats.add(chunk)
+    if stats.count is None:
+        raise ValueError("no trials to aggregate")
+    return stats.y, stats.dy
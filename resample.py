@@ -0,0 +1,147 @@
+'''
+Bootstrap and jackknife uncertainties for linear and polynomial fits.
+
+Every resample of a dataset has the same length, so all resamples in a
+batch are fit together as one (R, N) stack. Large bootstraps are split
+over a process pool; each worker draws from its own child of one
+SeedSequence, so the result depends on seed and workers but not on the
+order the workers finish in.
+'''
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from fitting import poly, weightedLinearFit, weightedPolyFit
+
+
+def _fit(x, y, dy, degree):
+    if degree==1:
+        return weightedLinearFit(x, y, dy)
+    return weightedPolyFit(x, y, dy, degree)
+
+
+def _replicateSample(rng, x, forces, dy, count):
+    '''Resamples the trials of each extension with replacement.
+    The means are refit with the dy of the full set of trials: with only a
+    few trials some resamples repeat one value and have no spread at all.
+    '''
+    rows, trials=forces.shape
+    picks=rng.integers(0, trials, size=(count, rows, trials))
+    sample=np.take_along_axis(np.broadcast_to(forces, picks.shape), picks, axis=-1)
+    return x, np.mean(sample, axis=-1), dy
+
+
+def _residualSample(rng, x, y, dy, fx, count):
+    '''Adds resampled normalized residuals (y-f(x))/dy back onto the best fit.'''
+    normalized=(y-fx)/dy
+    picks=rng.integers(0, len(y), size=(count, len(y)))
+    return x, fx+dy*normalized[picks], dy
+
+
+def _bootstrapWorker(task):
+    kind, data, degree, transform, count, seed, batch=task
+    rng=np.random.default_rng(seed)
+    params=[]
+    chi2=[]
+    for start in range(0, count, batch):
+        size=min(batch, count-start)
+        if kind=="replicates":
+            x, y, dy=_replicateSample(rng, *data, size)
+        else:
+            x, y, dy=_residualSample(rng, *data, size)
+        if transform is not None:
+            x, y, dy=transform(x, y, dy)
+        args, _, c=_fit(x, y, dy, degree)
+        params.append(args)
+        chi2.append(c)
+    return np.concatenate(params), np.concatenate(chi2)
+
+
+def _bootstrap(kind, data, degree, transform, resamples, workers, seed, level, batch):
+    if resamples<1:
+        raise ValueError("resamples must be at least 1, not %r"%resamples)
+    # every worker needs at least one resample
+    workers=min(workers, resamples)
+    seeds=np.random.SeedSequence(seed).spawn(workers)
+    counts=[resamples//workers+(i<resamples%workers) for i in range(workers)]
+    tasks=[(kind, data, degree, transform, n, s, batch) for n, s in zip(counts, seeds)]
+    if workers==1:
+        done=[_bootstrapWorker(tasks[0])]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            done=list(pool.map(_bootstrapWorker, tasks))
+    params=np.concatenate([p for p, _ in done])
+    chi2=np.concatenate([c for _, c in done])
+    tail=(1-level)/2*100
+    return {"params": params, "chi2": chi2, "std": np.std(params, axis=0, ddof=1),
+            "ci": np.percentile(params, [tail, 100-tail], axis=0).T}
+
+
+def bootstrapReplicates(x, forces, degree=1, transform=None, resamples=1000, workers=1,
+                        seed=0, level=0.68, batch=1024):
+    '''Bootstrap over the individual trials behind each y.
+    forces is the (extensions, trials) matrix from the tutorial; each
+    resample redraws the trials of every extension with replacement and
+    refits the resulting means, weighted by the standard uncertainty of
+    the mean of all the trials.
+    transform, e.g. batchfit.logLog, is applied to (x, y, dy) before fitting.
+    Returns a dict with params (resamples, degree+1), chi2 (resamples,),
+    std (the bootstrap standard error of each parameter) and ci, the
+    (degree+1, 2) central interval holding level of the resamples.
+    '''
+    forces=np.asarray(forces, dtype=float)
+    dy=np.std(forces, axis=1, ddof=1)/np.sqrt(forces.shape[1])
+    data=(np.asarray(x, dtype=float), forces, dy)
+    return _bootstrap("replicates", data, degree, transform, resamples, workers, seed, level,
+                      batch)
+
+
+def bootstrapResiduals(x, y, dy, degree=1, resamples=1000, workers=1, seed=0, level=0.68,
+                       batch=1024):
+    '''Bootstrap over residuals, for data without the individual trials.
+    Normalized residuals of the best fit are redrawn with replacement,
+    scaled by each point's dy and added back onto the fit.
+    Returns the same dict as bootstrapReplicates.
+    '''
+    x=np.asarray(x, dtype=float)
+    y=np.asarray(y, dtype=float)
+    dy=np.broadcast_to(np.asarray(dy, dtype=float), y.shape)
+    args, _, _=_fit(x, y, dy, degree)
+    fx=poly(x, args)
+    return _bootstrap("residuals", (x, y, dy, fx), degree, None, resamples, workers, seed,
+                      level, batch)
+
+
+def _jackknife(params):
+    n=len(params)
+    spread=params-np.mean(params, axis=0)
+    return {"params": params, "std": np.sqrt((n-1)/n*np.sum(spread**2, axis=0))}
+
+
+def jackknife(x, y, dy, degree=1):
+    '''Leave-one-point-out jackknife, all N refits in one stack.
+    Returns a dict with params (N, degree+1) and std, the jackknife
+    standard error of each parameter.
+    '''
+    x=np.asarray(x, dtype=float)
+    y=np.asarray(y, dtype=float)
+    dy=np.broadcast_to(np.asarray(dy, dtype=float), y.shape)
+    # an infinite uncertainty gives the left out point zero weight
+    dropped=np.where(np.eye(len(x), dtype=bool), np.inf, dy)
+    args, _, _=weightedPolyFit(x, y, dropped, degree)
+    return _jackknife(args)
+
+
+def jackknifeReplicates(x, forces, degree=1, transform=None):
+    '''Leave-one-trial-out jackknife over the columns of forces.'''
+    forces=np.asarray(forces, dtype=float)
+    trials=forces.shape[1]
+    keep=~np.eye(trials, dtype=bool)
+    sample=np.stack([forces[:, k] for k in keep])
+    y=np.mean(sample, axis=-1)
+    dy=np.std(sample, axis=-1, ddof=1)/np.sqrt(trials-1)
+    x=np.asarray(x, dtype=float)
+    if transform is not None:
+        x, y, dy=transform(x, y, dy)
+    args, _, _=_fit(x, y, dy, degree)
+    return _jackknife(args)
@@ -0,0 +1,162 @@
+'''
+Interactive fit and residuals plot for the slider exercises.
+
+The figure is built once; moving a slider only changes the data of the
+existing artists, instead of clearing the residuals axis and drawing a
+new errorbar plot every time. matplotlib is imported when the first plot
+is made, so importing this module stays cheap.
+'''
+import time
+
+import numpy as np
+
+from fitting import chiSquared, linear
+from profiling import profiled
+
+
+class ResidualPlot:
+    '''Data with a fit line on the left, residuals f(x) - y on the right.
+    f and args are the function being fit and its starting arguments.
+    grid, a landscape.ChiSquaredGrid over the same sliders, makes the
+    chi-squared of each slider move a lookup in its cached surface.
+    fps is the most redraws per second that update will ask for; slider
+    moves in between are drawn together once the interval has passed.
+    '''
+
+    def __init__(self, x, y, dy, f=linear, args=(0, 1), fps=60, grid=None,
+                 xlabel="extension (cm)", ylabel="force (N)", figsize=(8, 4)):
+        self.x=np.asarray(x, dtype=float)
+        self.y=np.asarray(y, dtype=float)
+        self.dy=np.asarray(dy, dtype=float)
+        self.f=f
+        self.grid=grid
+        self.interval=1/fps
+        self._lastDraw=-np.inf
+        self._pending=False
+
+        import matplotlib.pyplot as plt
+        self.fig, self.ax=plt.subplots(1, 2, figsize=figsize)
+        fx=f(self.x, args)
+        residuals=fx-self.y
+        self.ax[0].set_title("force vs extension")
+        self.line,=self.ax[0].plot(self.x, fx)
+        self.ax[0].errorbar(self.x, self.y, self.dy, fmt='.k')
+        self.ax[0].set_xlabel(xlabel)
+        self.ax[0].set_ylabel(ylabel)
+        res=self.ax[1].errorbar(self.x, residuals, self.dy, fmt='.k')
+        self.markers=res.lines[0]
+        self.bars=res.lines[2][0]
+        self.ax[1].grid(True, which='both')
+        self.ax[1].set_title("Residuals")
+        self.ax[1].set_xlabel(xlabel)
+        self.ax[1].set_ylabel("f(x) - y")
+
+        # error bar segments are (x, r-dy) -> (x, r+dy); only the y column changes
+        self._segments=np.empty((len(self.x), 2, 2))
+        self._segments[:, :, 0]=self.x[:, None]
+        self._timer=self.fig.canvas.new_timer(interval=max(1, int(1000*self.interval)))
+        self._timer.single_shot=True
+        self._timer.add_callback(self.flush)
+        self._setResiduals(residuals)
+
+    def _setResiduals(self, residuals):
+        self.markers.set_ydata(residuals)
+        np.subtract(residuals, self.dy, out=self._segments[:, 0, 1])
+        np.add(residuals, self.dy, out=self._segments[:, 1, 1])
+        self.bars.set_segments(self._segments)
+        low=self._segments[:, 0, 1].min()
+        high=self._segments[:, 1, 1].max()
+        pad=0.05*(high-low) or 1
+        self.ax[1].set_ylim(low-pad, high+pad)
+
+    @profiled("plot")
+    def update(self, *args):
+        '''Moves the fit to args and returns its chi-squared value.'''
+        fx=self.f(self.x, args)
+        residuals=fx-self.y
+        self.line.set_ydata(fx)
+        self._setResiduals(residuals)
+        self.requestDraw()
+        if self.grid is not None:
+            value=self.grid.lookup(*args)
+            if value is not None:
+                return value
+        return chiSquared(self.x, self.y, self.dy, self.f, args)
+
+    def requestDraw(self):
+        '''Redraws now, or once the fps interval has passed since the last draw.'''
+        if time.perf_counter()-self._lastDraw>=self.interval:
+            self.flush()
+        elif not self._pending:
+            self._pending=True
+            self._timer.start()
+
+    def flush(self):
+        '''Draws any pending slider moves.'''
+        self._pending=False
+        self.fig.canvas.draw_idle()
+        self._lastDraw=time.perf_counter()
+
+
+def _rebuildUpdate(fig, ax, line, x, y, dy, args):
+    '''The original notebook callback, clearing and redrawing the residuals.'''
+    fx=linear(x, args)
+    line.set_ydata(fx)
+    residuals=fx-y
+    ax[1].cla()
+    ax[1].errorbar(x, residuals, dy, fmt='.k')
+    ax[1].grid(True, which='both')
+    ax[1].set_title("Residuals")
+    fig.canvas.draw_idle()
+    return chiSquared(x, y, dy, linear, args)
+
+
+def benchmarkCallbacks(sizes=(10, 1000, 100000), seconds=1.0, fps=60):
+    '''Callbacks per second of ResidualPlot.update against the original
+    ax.cla() + errorbar callback, for each number of points in sizes.
+    Returns a list of (N, incremental, rebuild) rows.
+    '''
+    import matplotlib.pyplot as plt
+    rng=np.random.default_rng(0)
+    rows=[]
+    for n in sizes:
+        n=int(n)
+        x=np.linspace(1, 8, n)
+        y=x+rng.normal(size=n)
+        dy=np.ones(n)
+        slopes=rng.uniform(0, 2, size=1024)
+
+        plot=ResidualPlot(x, y, dy, fps=fps)
+        plot.fig.canvas.draw()
+        incremental=_callbackRate(lambda s: plot.update(0, s), slopes, seconds)
+        plt.close(plot.fig)
+
+        fig, ax=plt.subplots(1, 2, figsize=(8, 4))
+        line,=ax[0].plot(x, linear(x, [0, 1]))
+        ax[0].errorbar(x, y, dy, fmt='.k')
+        ax[1].errorbar(x, linear(x, [0, 1])-y, dy, fmt='.k')
+        fig.canvas.draw()
+        rebuild=_callbackRate(lambda s: _rebuildUpdate(fig, ax, line, x, y, dy, [0, s]),
+                              slopes, seconds)
+        plt.close(fig)
+        rows.append((n, incremental, rebuild))
+    return rows
+
+
+def _callbackRate(callback, slopes, seconds):
+    calls=0
+    start=time.perf_counter()
+    while True:
+        callback(slopes[calls%len(slopes)])
+        calls+=1
+        elapsed=time.perf_counter()-start
+        if elapsed>=seconds:
+            return calls/elapsed
+
+
+if __name__=="__main__":
+    import matplotlib
+    matplotlib.use("Agg")
+    print("%10s %22s %22s"%("N", "incremental (calls/s)", "cla rebuild (calls/s)"))
+    for n, incremental, rebuild in benchmarkCallbacks():
+        print("%10d %22.1f %22.1f"%(n, incremental, rebuild))
@@ -0,0 +1,95 @@
+'''
+Outlier-resistant fits by iteratively reweighted least squares.
+
+Instead of inflating the uncertainty of a suspect point by hand (as in
+uncertainty[4]=4 in the curve fitting tutorial), each point's weight is
+cut back according to how many standard deviations its residual is from
+the current fit, and the weighted fit is repeated.
+'''
+import numpy as np
+
+from fitting import poly, weightedLinearFit, weightedPolyFit
+
+# tuning constants giving 95% efficiency for normally distributed residuals
+HUBER=1.345
+TUKEY=4.685
+
+
+def huberWeights(u, c=HUBER):
+    '''1 for |u| <= c, c/|u| beyond; u are normalized residuals.'''
+    a=np.abs(u)
+    return np.minimum(1, c/np.where(a>0, a, 1))
+
+
+def tukeyWeights(u, c=TUKEY):
+    '''(1-(u/c)**2)**2 for |u| < c, 0 beyond.'''
+    return np.where(np.abs(u)<c, (1-(u/c)**2)**2, 0.0)
+
+
+LOSSES={"huber": (huberWeights, HUBER), "tukey": (tukeyWeights, TUKEY)}
+
+
+def _scale(u, scale):
+    if scale=="dy":
+        return np.ones(u.shape[:-1])
+    if scale=="mad":
+        mad=np.median(np.abs(u-np.median(u, axis=-1, keepdims=True)), axis=-1)
+        return np.maximum(1.4826*mad, np.finfo(float).tiny)
+    raise ValueError("scale must be 'dy' or 'mad', not %r"%scale)
+
+
+def robustFit(x, y, dy, degree=1, loss="huber", c=None, scale="dy", maxIterations=20,
+              tol=1e-8):
+    '''Huber or Tukey fit of a line (degree=1) or poly of any degree.
+    x, y and dy are (N,) arrays or (B, N) stacks, all fit together; every
+    iteration is one batched weightedLinearFit or weightedPolyFit, and at
+    most maxIterations are done (per stage, for Tukey). The normalized
+    residuals r/dy are measured in units of dy (scale="dy"), which trusts
+    the quoted uncertainties, or of their median absolute deviation
+    (scale="mad") when they are only relative. Tukey fits start from the
+    Huber fit, since Tukey's loss can settle on the wrong minimum from a
+    poor start.
+    Returns a dict with args, cov, chi2 (reduced, with the final weights),
+    residuals (normalized, f(x)-y over dy), weights (between 0 and 1),
+    outliers (points given less than half weight), and iterations.
+    '''
+    x, y, dy=np.broadcast_arrays(np.asarray(x, dtype=float), np.asarray(y, dtype=float),
+                                 np.asarray(dy, dtype=float))
+    if loss not in LOSSES:
+        raise ValueError("loss must be one of %s, not %r"%(", ".join(LOSSES), loss))
+    weight, default=LOSSES[loss]
+    c=default if c is None else c
+
+    def solve(dyEffective):
+        if degree==1:
+            return weightedLinearFit(x, y, dyEffective)
+        return weightedPolyFit(x, y, dyEffective, degree)
+
+    def normalized(args):
+        coefs=args if args.ndim==1 else np.moveaxis(args, -1, 0)[..., None]
+        return (poly(x, coefs)-y)/dy
+
+    if loss=="tukey":
+        start=robustFit(x, y, dy, degree, "huber", scale=scale, maxIterations=maxIterations,
+                        tol=tol)
+        args, cov, iterations=start["args"], start["cov"], start["iterations"]
+    else:
+        args, cov, _=solve(dy)
+        iterations=0
+    for _ in range(maxIterations):
+        u=normalized(args)
+        w=weight(u/_scale(u, scale)[..., None], c)
+        with np.errstate(divide='ignore'):
+            dyEffective=dy/np.sqrt(w)
+        newArgs, cov, _=solve(dyEffective)
+        iterations+=1
+        done=np.all(np.abs(newArgs-args)<=tol*(1+np.abs(newArgs)))
+        args=newArgs
+        if done:
+            break
+
+    u=normalized(args)
+    w=weight(u/_scale(u, scale)[..., None], c)
+    dof=np.sum(w>0, axis=-1)-(degree+1)
+    return {"args": args, "cov": cov, "chi2": np.sum(w*u**2, axis=-1)/dof,
+            "residuals": u, "weights": w, "outliers": w<0.5, "iterations": iterations}
@@ -0,0 +1,82 @@
+'''
+Measurements and fit results on disk, one .npy file per column.
+
+A bundle is a directory holding x.npy, y.npy, dy.npy, trials.npy or any
+other named columns. Columns are opened memory-mapped, so reading only
+touches the files, and the rows of them, that a fit actually uses.
+Stacks of datasets are stored as (B, N) columns.
+'''
+import os
+import re
+
+import numpy as np
+
+from profiling import profiled
+
+_NAME=re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+
+def _columnPath(path, name):
+    if not _NAME.match(name):
+        raise ValueError("column name %r must be a python identifier"%name)
+    return os.path.join(path, name+".npy")
+
+
+def columnNames(path):
+    '''Names of the columns stored in a bundle.'''
+    return sorted(name[:-4] for name in os.listdir(path)
+                  if name.endswith(".npy") and "." not in name[:-4])
+
+
+@profiled("write")
+def writeColumns(path, dtype=None, **columns):
+    '''Writes (or replaces) columns of a bundle, creating it if needed.
+    Each column is written to a temporary file first and then renamed,
+    so a reader never sees a half written column. dtype, if given, is the
+    type floating point columns are stored as, e.g. np.float32 to halve
+    what fitting.chiSquaredChunked reads.
+    '''
+    os.makedirs(path, exist_ok=True)
+    for name, values in columns.items():
+        target=_columnPath(path, name)
+        values=np.asarray(values)
+        if values.dtype==object:
+            values=values.astype(str)
+        elif dtype is not None and values.dtype.kind=='f':
+            values=values.astype(dtype)
+        temporary=target+".tmp.npy"
+        np.save(temporary, values)
+        os.replace(temporary, target)
+
+
+@profiled("load")
+def readColumns(path, names=None, rows=None, mmap=True):
+    '''Opens columns of a bundle as a dict of arrays.
+    names picks the columns (all of them by default) and rows is an
+    optional slice or index array along the first axis. With mmap=True a
+    slice is a view of the memory-mapped file and nothing is read until
+    the values are used.
+    '''
+    names=columnNames(path) if names is None else names
+    columns={}
+    for name in names:
+        values=np.load(_columnPath(path, name), mmap_mode='r' if mmap else None)
+        columns[name]=values if rows is None else values[rows]
+    return columns
+
+
+def writeDataset(path, dataset):
+    '''Writes a dataset.Dataset with its derived ln columns.'''
+    writeColumns(path, x=dataset.x, y=dataset.y, dy=dataset.dy,
+                 lnx=dataset.lnx, lny=dataset.lny, dlny=dataset.dlny)
+
+
+def readDataset(path, rows=None):
+    '''(x, y, dy) of a bundle, memory-mapped.'''
+    columns=readColumns(path, ("x", "y", "dy"), rows=rows)
+    return columns["x"], columns["y"], columns["dy"]
+
+
+def writeResults(path, table):
+    '''Writes a column table, such as the one from batchfit.fitMany.'''
+    writeColumns(path, **table)
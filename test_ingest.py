@@ -0,0 +1,62 @@
+import asyncio
+import json
+import time
+
+import numpy as np
+
+import ingest
+from ingest import IngestPipeline, fileSource
+
+
+def _message(seed, start=1.):
+    x=np.arange(start, start+10)
+    forces=np.random.default_rng(seed).normal(loc=x[:, None], scale=1, size=(10, 5))
+    return json.dumps({"x": x.tolist(), "forces": forces.tolist()})+"\n"
+
+
+def _run(pipeline, sources):
+    return asyncio.run(asyncio.wait_for(pipeline.run(sources), 5))
+
+
+def test_bad_line_does_not_stop_the_source(tmp_path):
+    path=tmp_path/"rig.jsonl"
+    lines=[_message(seed) for seed in range(6)]
+    lines.insert(2, '{"x": [1, 2], "forces": \n')
+    path.write_text("".join(lines))
+    pipeline=IngestPipeline(workers=2, queueSize=2)
+    _run(pipeline, {"rig": fileSource(str(path))})
+    metrics=pipeline.metrics()["rig"]
+    assert metrics["batches"]==6
+    assert metrics["errors"]==1
+    assert pipeline.results["rig"]["sequence"]==5
+
+
+def test_failing_publish_does_not_hang(tmp_path):
+    path=tmp_path/"rig.jsonl"
+    path.write_text("".join(_message(seed) for seed in range(10)))
+
+    def publish(result):
+        raise RuntimeError("subscriber went away")
+    pipeline=IngestPipeline(workers=2, queueSize=2, publish=publish)
+    _run(pipeline, {"rig": fileSource(str(path))})
+    assert pipeline.metrics()["rig"]["batches"]==10
+    assert len(pipeline.errors["rig"])==10
+
+
+def test_results_keep_the_newest_batch(tmp_path, monkeypatch):
+    path=tmp_path/"rig.jsonl"
+    path.write_text("".join(_message(seed, start=seed+1.) for seed in range(6)))
+    fit=ingest.reduceAndFit
+
+    def slowBatch4(x, forces):
+        # batch 4 (x from 5) finishes after the newer batch 5
+        if x[0]==5:
+            time.sleep(0.2)
+        return fit(x, forces)
+    monkeypatch.setattr(ingest, "reduceAndFit", slowBatch4)
+    finished=[]
+    pipeline=IngestPipeline(workers=3, queueSize=2,
+                            publish=lambda result: finished.append(result["sequence"]))
+    _run(pipeline, {"rig": fileSource(str(path))})
+    assert finished[-1]==4
+    assert pipeline.results["rig"]["sequence"]==5